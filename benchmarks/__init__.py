@@ -0,0 +1,5 @@
+"""
+Benchmarks of the render pipeline, run with python -m benchmarks.
+Each workload renders into an in-memory stream, and is measured for wall time, items (cells drawn or
+keys parsed) per second, bytes emitted and peak memory allocated, optionally against a saved baseline.
+"""
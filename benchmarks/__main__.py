@@ -0,0 +1,107 @@
+"""
+Runs the benchmarks, optionally saving the results as a baseline or comparing against one.
+
+  python -m benchmarks [workload ...] [--rows 40] [--cols 120] [--repeat 5]
+                       [--save baseline.json] [--baseline baseline.json] [--tolerance 0.1]
+                       [--cast session.cast]
+
+Comparing exits with 1 when any workload got slower than the tolerance allows, or emits more bytes.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from typing import Dict
+
+from termkit.emulator import Emulator
+
+from .workloads import WORKLOADS, cast_workload
+
+def measure(name: str, rows: int, cols: int, repeat: int) -> Dict[str, float]:
+  """Times the best of the repeats, then runs once more while tracing allocations."""
+  setup = WORKLOADS[name]
+  best = None
+  for _ in range(repeat):
+    run, out = setup(rows, cols)
+    start = time.perf_counter()
+    items = run()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+
+  run, out = setup(rows, cols)
+  tracemalloc.start()
+  try:
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+
+  return {
+    "seconds": best,
+    "items_per_second": items / best if best else 0.0,
+    "bytes": out.bytes if isinstance(out, Emulator) else len(out.getvalue().encode("utf-8")),
+    "peak_bytes": peak,
+  }
+
+def change(value: float, base: float) -> str:
+  if not base:
+    return "n/a"
+  return "{:+.1f}%".format((value / base - 1) * 100)
+
+def main(argv=None) -> int:
+  parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks the render pipeline.")
+  parser.add_argument("workloads", nargs="*", help="the workloads to run, all by default: " + ", ".join(WORKLOADS))
+  parser.add_argument("--rows", type=int, default=40)
+  parser.add_argument("--cols", type=int, default=120)
+  parser.add_argument("--repeat", type=int, default=5, help="the best of how many runs is timed")
+  parser.add_argument("--save", metavar="FILE", help="save the results as a baseline")
+  parser.add_argument("--baseline", metavar="FILE", help="compare the results against a baseline")
+  parser.add_argument("--cast", metavar="FILE", help="also replay a recorded asciicast, as the replay workload")
+  parser.add_argument("--tolerance", type=float, default=0.1, help="how much slower than the baseline is allowed")
+  args = parser.parse_args(argv)
+  if args.cast:
+    WORKLOADS["replay"] = cast_workload(args.cast)
+  unknown = [name for name in args.workloads if name not in WORKLOADS]
+  if unknown:
+    parser.error("unknown workloads: {}".format(", ".join(unknown)))
+
+  baseline = {}
+  if args.baseline:
+    with open(args.baseline) as file:
+      baseline = json.load(file)
+
+  results = {}
+  regressed = []
+  print("{:<10} {:>10} {:>14} {:>10} {:>12}".format("workload", "ms", "items/s", "bytes", "peak KiB"))
+  for name in args.workloads or WORKLOADS:
+    result = results[name] = measure(name, args.rows, args.cols, args.repeat)
+    line = "{:<10} {:>10.2f} {:>14,.0f} {:>10,} {:>12,.1f}".format(
+      name, result["seconds"] * 1000, result["items_per_second"], result["bytes"], result["peak_bytes"] / 1024,
+    )
+
+    base = baseline.get(name)
+    if base:
+      line += "  time {:>7}  bytes {:>7}  peak {:>7}".format(
+        change(result["seconds"], base["seconds"]),
+        change(result["bytes"], base["bytes"]),
+        change(result["peak_bytes"], base["peak_bytes"]),
+      )
+      if result["seconds"] > base["seconds"] * (1 + args.tolerance) or result["bytes"] > base["bytes"]:
+        regressed.append(name)
+        line += "  REGRESSED"
+    print(line)
+
+  if args.save:
+    with open(args.save, "w") as file:
+      json.dump(results, file, indent=2)
+
+  if regressed:
+    print("regressed: {}".format(", ".join(regressed)), file=sys.stderr)
+    return 1
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+The standard workloads. Each is set up with the size of the screen and returns the function to time,
+which returns how many items it processed, along with the stream the terminal writes into.
+Setup is left out of the timing, and all randomness is seeded so every run emits the same bytes.
+"""
+
+import io
+import random
+
+from typing import Callable, Dict, Tuple, Union
+
+from termkit import Canvas, Cell, Color, Screen, Terminal
+from termkit import escape
+from termkit.emulator import Emulator
+from termkit.record import read_cast, replay
+
+__all__ = ["WORKLOADS", "cast_workload"]
+
+Setup = Callable[[int, int], Tuple[Callable[[], int], Union[io.StringIO, Emulator]]]
+
+WORKLOADS: Dict[str, Setup] = {}
+
+def workload(name: str):
+  def register(setup: Setup) -> Setup:
+    WORKLOADS[name] = setup
+    return setup
+  return register
+
+def terminal(**kwargs) -> Tuple[Terminal, io.StringIO]:
+  out = io.StringIO()
+  return Terminal(io.StringIO(), out, colors=256, **kwargs), out
+
+FRAMES = 60  # frames drawn by the workloads which present a screen
+
+def text_canvas(text: str, cols: int, bg: Color = None) -> Canvas:
+  canvas = Canvas(1, cols)
+  for column, char in enumerate(text.ljust(cols)[:cols]):
+    canvas[0, column] = Cell(char, bg=bg)
+  return canvas
+
+@workload("fill")
+def fill(rows: int, cols: int):
+  """Draws a whole canvas of a single colored cell, the same as the first frame of a screen."""
+  term, out = terminal()
+  canvas = Canvas(rows, cols)
+  canvas.fill(Cell("#", Color(255, 128, 0), Color(0, 0, 64)))
+
+  def run():
+    canvas.draw(term)
+    term.flush()
+    return rows * cols
+  return run, out
+
+@workload("sparse")
+def sparse(rows: int, cols: int):
+  """Presents frames where a few random cells change, such as a dashboard of counters."""
+  term, out = terminal()
+  screen = Screen(term, rows, cols)
+  screen.back.fill(Cell(" "))
+  screen.present()
+  out.seek(0)
+  out.truncate()
+
+  rand = random.Random(0)
+  colors = [Color(rand.randrange(256), rand.randrange(256), rand.randrange(256)) for _ in range(16)]
+  updates = [
+    [
+      ((rand.randrange(rows), rand.randrange(cols)), Cell(rand.choice("0123456789"), rand.choice(colors)))
+      for _ in range(max(rows * cols // 100, 1))
+    ]
+    for _ in range(FRAMES)
+  ]
+
+  def run():
+    for frame in updates:
+      for position, cell in frame:
+        screen.back[position] = cell
+      screen.present()
+    return sum(len(frame) for frame in updates)
+  return run, out
+
+@workload("scroll")
+def scroll(rows: int, cols: int):
+  """Presents a log pane gaining a line every frame above a status line."""
+  term, out = terminal()
+  screen = Screen(term, rows, cols)
+  log = screen.back.view(0, 0, rows - 1, cols)
+  status = screen.back.view(rows - 1, 0, 1, cols)
+  lines = [
+    text_canvas("{:>6} request handled in {} ms".format(number, number * 7 % 300), cols)
+    for number in range(FRAMES + rows)
+  ]
+  statuses = [text_canvas("lines {}".format(first), cols, Color(0, 0, 128)) for first in range(FRAMES + 1)]
+
+  def show(first: int):
+    for row in range(log.rows):
+      log.blit(lines[first + row], row)
+    status.blit(statuses[first])
+
+  show(0)
+  screen.present()
+  out.seek(0)
+  out.truncate()
+
+  def run():
+    for first in range(1, FRAMES + 1):
+      show(first)
+      screen.present()
+    return FRAMES * rows * cols
+  return run, out
+
+@workload("gradient")
+def gradient(rows: int, cols: int):
+  """Paints a truecolor gradient a cell at a time through the color and cursor methods."""
+  term, out = terminal(truecolor=True)
+  term.columns = cols
+
+  def run():
+    term.move_to(0, 0)
+    for row in range(rows):
+      for column in range(cols):
+        term.bg(Color(column * 255 // cols, row * 255 // rows, 128))
+        term.fg(Color(255 - column * 255 // cols, 255, row * 255 // rows))
+        term.write("▀")
+      term.move_by(x=-cols, y=1)
+    term.reset_style()
+    return rows * cols
+  return run, out
+
+@workload("keys")
+def keys(rows: int, cols: int):
+  """Parses a burst of typing, arrow and function keys and mouse reports."""
+  term, out = terminal()
+  rand = random.Random(0)
+  pieces = (
+    ["hello world "] * 4
+    + [key.value for key in escape.KEYS if key.value.startswith("\x1b")][:40]
+    + [escape.KEY_MOUSE_PRESS.format(button=0, column=rand.randrange(cols), row=rand.randrange(rows))]
+    + [escape.KEY_MOUSE_RELEASE.format(button=0, column=rand.randrange(cols), row=rand.randrange(rows))]
+    + ["\x03", "\x1ba", "\x7f"]
+  )
+  burst = "".join(rand.choice(pieces) for _ in range(rows * cols // 4))
+
+  def run():
+    return len(term.parse_keys(burst))
+  return run, out
+
+@workload("composite")
+def composite(rows: int, cols: int):
+  """Layers a window and a translucent overlay over a background, then draws the differences."""
+  term, out = terminal()
+  background = Canvas(rows, cols)
+  background.fill(Cell(".", Color(64, 64, 64), Color(0, 0, 0)))
+  window = Canvas(rows, cols)
+  window.view(rows // 4, cols // 4, rows // 2, cols // 2).fill(Cell(" ", bg=Color(0, 0, 160)))
+  overlay = Canvas(rows, cols)
+  overlay.view(rows // 3, cols // 3, rows // 3, cols // 3).fill(Cell("", fx=0, bg=Color(160, 0, 0)))
+  last = background.copy()
+
+  def run():
+    frame = overlay | window | background
+    frame.draw_spans(term, frame.diff(last))
+    return rows * cols * 3
+  return run, out
+
+def cast_workload(path: str) -> Setup:
+  """Replays a recorded session into an emulator as fast as possible, measuring real output."""
+  with open(path, encoding="utf-8") as file:
+    recording = file.read()
+  header, _ = read_cast(io.StringIO(recording))
+
+  def setup(rows: int, cols: int):
+    emulator = Emulator(header["height"], header["width"])
+
+    def run():
+      replay(io.StringIO(recording), emulator, speed=None)
+      return emulator.bytes
+    return run, emulator
+  return setup
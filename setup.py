@@ -4,6 +4,10 @@ setup(
   name="termkit",
   version="0.1",
   packages=["termkit"],
+  python_requires=">=3.10",  # slotted dataclasses
+  extras_require={
+    "numpy": ["numpy"],  # faster canvas layering and diffing
+  },
   # package_dir={}
   # package_data={},
   zip_safe=True,
@@ -1,6 +1,8 @@
 # from .term import *
 # from .style import fg, bg, fx
-from .canvas import Cell, Canvas
+from .canvas import Cell, Canvas, CanvasView, Span
+from .screen import Screen
+from .scheduler import Scheduler
 from .style import Color
 from .term import Terminal
 from .tty import tty
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Asyncio front end to the terminal, so input and output are driven by the event loop instead of
+blocking the thread.
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+from typing import AsyncIterator
+
+from .escape import Key
+from .term import READ_SIZE, Terminal
+from .writer import WRITE_SIZE
+
+__all__ = ["AsyncTerminal"]
+
+class AsyncTerminal(Terminal):
+  """
+  A terminal which reads keys and writes output through an asyncio event loop.
+  Output is queued and written as the terminal is ready for it, and drain waits for the queue to go
+  down when it has grown past high_water bytes, so a slow terminal pushes back on the application.
+  If writing fails, the queued output is dropped and the error is raised by drain and any later writes.
+  """
+  def __init__(
+    self,
+    stdin: io.TextIOBase = sys.stdin,
+    stdout: io.TextIOBase = sys.stdout,
+    *_,
+    high_water: int = 64 * 1024,
+    **kwargs,
+  ):
+    super().__init__(stdin, stdout, **kwargs)
+    self.high_water = high_water
+    self._outgoing = bytearray()
+    self._writing = False
+    self._drain_waiters = []
+    self.error = None  # the error which stopped output, if writing failed
+
+  def _write(self, text: str):
+    if self._frame is not None:
+      self._frame.append(text)
+    else:
+      self._count(text)
+      self.writeb(text.encode(self.stdout.encoding or "utf-8"))
+
+  def writeb(self, data: bytes):
+    """Queues the bytes to be written once the terminal is ready for them."""
+    if self.error is not None:
+      raise self.error
+    self._outgoing += data
+    if not self._writing and self._outgoing:
+      asyncio.get_running_loop().add_writer(self.stdout.fileno(), self._on_writable)
+      self._writing = True
+
+  def _on_writable(self):
+    try:
+      written = os.write(self.stdout.fileno(), memoryview(self._outgoing)[:WRITE_SIZE])
+    except (BlockingIOError, InterruptedError):
+      return
+    except OSError as error:
+      # the terminal has gone away, so there is nowhere left to send anything
+      self.error = error
+      self._outgoing.clear()
+    else:
+      del self._outgoing[:written]
+
+    if not self._outgoing:
+      asyncio.get_running_loop().remove_writer(self.stdout.fileno())
+      self._writing = False
+    if len(self._outgoing) <= self.high_water:
+      for waiter in self._drain_waiters:
+        if waiter.done():
+          continue
+        elif self.error is not None:
+          waiter.set_exception(self.error)
+        else:
+          waiter.set_result(None)
+      self._drain_waiters.clear()
+
+  async def drain(self):
+    """Waits until the queued output is no more than high_water bytes."""
+    if self.error is not None:
+      raise self.error
+    while len(self._outgoing) > self.high_water:
+      waiter = asyncio.get_running_loop().create_future()
+      self._drain_waiters.append(waiter)
+      await waiter
+
+  async def events(self) -> AsyncIterator[Key]:
+    """
+    Yields keys as they are read from the terminal, until the input is closed.
+    Incomplete sequences are given escape_timeout seconds to be completed, as with read_keys.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    fd = self.stdin.fileno()
+    timer = None
+
+    def on_timeout():
+      for key in self._keys.flush():
+        queue.put_nowait(key)
+
+    def on_readable():
+      nonlocal timer
+      try:
+        data = os.read(fd, READ_SIZE)
+      except (BlockingIOError, InterruptedError):
+        return
+      if not data:
+        loop.remove_reader(fd)
+        # the input ended, so whatever is left can't be the start of a sequence
+        for key in self._keys.flush():
+          queue.put_nowait(key)
+        queue.put_nowait(None)
+        return
+
+      if timer is not None:
+        timer.cancel()
+        timer = None
+      for key in self.parse_keys(self._decoder.decode(data)):
+        queue.put_nowait(key)
+      if self._keys.pending:
+        timer = loop.call_later(self.escape_timeout, on_timeout)
+
+    loop.add_reader(fd, on_readable)
+    try:
+      while True:
+        key = await queue.get()
+        if key is None:
+          break
+        yield key
+    finally:
+      loop.remove_reader(fd)
+      if timer is not None:
+        timer.cancel()
@@ -1,13 +1,21 @@
-import copy
+import functools
+import itertools
 import typing
 
+from array import array
+from collections import Counter, namedtuple
 from dataclasses import dataclass
-from typing import List, Tuple, Union, Iterable
+from typing import Dict, List, Tuple, Union, Iterable
 
-from .style import Color, BOLD, DIM, REVERSE, UNDERLINE, ITALIC, CONCEAL, BLINK, STRIKE, CHARSET, HYPERLINK
-from .term import Terminal
+try:
+  import numpy
+except ImportError:  # numpy is optional, Canvas works without it
+  numpy = None
 
-@dataclass(init=True, eq=True, order=False, frozen=True)
+from .style import INTERN_SIZE, Color, intern_color, BOLD, DIM, REVERSE, UNDERLINE, ITALIC, CONCEAL, BLINK, STRIKE, CHARSET, HYPERLINK
+from .term import Terminal, is_narrow
+
+@dataclass(init=True, eq=True, order=False, frozen=True, slots=True)
 class Cell():
   """
   Cell contains the fields representing the character, foreground color, background color and style
@@ -16,6 +24,9 @@ class Cell():
   All fields have a sentinel value indicating transparency, and that in the case of layering another layer,
   the layer should inherit the other's value. Otherwise, sentinel values are considered as empty values when
   outputting the final canvas.
+
+  Cells are immutable, so equal cells can be shared. intern_cell gives the one shared cell of the fields,
+  which is how canvases and layering create them.
   """
 
   char: str = ""  # empty string is transparent, all else overwrites
@@ -23,6 +34,14 @@ class Cell():
   bg: Union[Color, None] = None
   fx: int = 0  # mask of attributes, all disabled by default
 
+  def __eq__(self, other) -> bool:
+    # interned cells are compared by identity before their fields
+    if self is other:
+      return True
+    if other.__class__ is not self.__class__:
+      return NotImplemented
+    return self.char == other.char and self.fg == other.fg and self.bg == other.bg and self.fx == other.fx
+
   def __or__(self, other):
     if not isinstance(other, self.__class__):
       return NotImplemented
@@ -32,7 +51,9 @@ class Cell():
     # since there is no significant use case when inheriting attributes makes any kind of rational
     # sense, it is statically implemented as taking only from the upper layer
     fx = self.fx
-    return self.__class__(char, fg, bg, fx)
+    if self.__class__ is not Cell:
+      return self.__class__(char, fg, bg, fx)
+    return intern_cell(char, fg, bg, fx)
 
   def draw(self, term: Terminal):
     # there is no character to print, so short circuit and skip it
@@ -40,80 +61,823 @@ class Cell():
       term.move_by(x=1)
       return
 
-    term.fg(self.fg)  # None resets the color
-    term.bg(self.bg)
+    term.set_style(self.fg, self.bg, self.fx)  # None resets the color
+    term.write(self.char)
 
-    # term.bold(bool(self.fx & BOLD))
-    # term.dim(bool(self.fx & DIM))
-    # term.reverse(bool(self.fx & REVERSE))
-    # term.underline(bool(self.fx & UNDERLINE))
-    # term.italic(bool(self.fx & ITALIC))
-    # term.conceal(bool(self.fx & CONCEAL))
-    # term.blink(bool(self.fx & BLINK))
-    # term.strike(bool(self.fx & STRIKE))
-    # term.charset(bool(self.fx & CHARSET))
-    # term.hyperlink(bool(self.fx & HYPERLINK))
+@functools.lru_cache(maxsize=INTERN_SIZE)
+def _intern_cell(char: str, fg: Union[Color, int, None], bg: Union[Color, int, None], fx: int) -> Cell:
+  return Cell(char, fg, bg, fx)
 
-    term.write(self.char)
+def intern_cell(
+  char: str = "",
+  fg: Union[Color, int, None] = None,
+  bg: Union[Color, int, None] = None,
+  fx: int = 0,
+) -> Cell:
+  """
+  Gets the one shared cell with the fields, creating it the first time.
+
+  >>> intern_cell("a", 1) is intern_cell(char="a", fg=1, fx=0)
+  True
+  """
+  # the cache is keyed by how it is called, so every field is passed the same way
+  return _intern_cell(char, fg, bg, fx)
+
+def cell_style(cell: Cell) -> Tuple[Union[Color, None], Union[Color, None], int]:
+  return (cell.fg, cell.bg, cell.fx)
+
+def _run_style(cell: Cell) -> Union[Tuple[Union[Color, None], Union[Color, None], int], None]:
+  return (cell.fg, cell.bg, cell.fx) if cell.char else None
+
+def draw_cells(term: Terminal, cells: Iterable[Cell]):
+  """
+  Draws consecutive cells of a row, setting the style once then writing the characters of each run
+  of cells in the same style all at once. Runs of transparent cells are moved over.
+  """
+  for style, run in itertools.groupby(cells, _run_style):
+    if style is None:
+      term.move_by(x=sum(1 for _ in run))
+    else:
+      term.set_style(*style)
+      term.write("".join(cell.char for cell in run))
+
+# the longest gap between spans which may be printed over instead of moving the cursor across
+REPRINT_GAP = 4
+
+Span = namedtuple("Span", ["row", "column", "cells"])
+Span.__doc__ = """A horizontal run of consecutive cells starting at the given row and column."""
+
+# the fewest rows a scroll has to save from being drawn again for it to be used
+SCROLL_MIN_ROWS = 2
+# the most likely shifts which are checked for a scroll
+SCROLL_CANDIDATES = 4
+
+Scroll = namedtuple("Scroll", ["top", "bottom", "amount"])
+Scroll.__doc__ = """
+Rows from the top up to the bottom scrolling up by the amount, or down if it is negative.
+"""
+
+# cells are packed into parallel arrays, characters by their code point and colors as 0xRRGGBB
+EMPTY = 0  # the code of the transparent character
+CLUSTER = 0x110000  # past the last code point, marks characters of more than one code point
+TRANSPARENT = 0xFFFFFFFF  # the packed transparent color
+PALETTE = 0x01000000  # set on packed palette ids, to tell them apart from truecolor
+
+def pack_color(color: Union[Color, int, None]) -> int:
+  if color is None:
+    return TRANSPARENT
+  elif type(color) is int:
+    return PALETTE | color
+  return color.red << 16 | color.green << 8 | color.blue
+
+def unpack_color(value: int) -> Union[Color, int, None]:
+  if value == TRANSPARENT:
+    return None
+  elif value & PALETTE:
+    return value & 0xFF
+  return intern_color(value >> 16, value >> 8 & 0xFF, value & 0xFF)
 
 class Canvas():
-  __slots__ = ("canvas")
-  canvas: List[Cell]
+  """
+  A grid of cells, stored as a structure of arrays holding the packed fields of every cell in row
+  major order. Cells are created on access, as views of what is stored.
+  """
+  __slots__ = ("_rows", "_cols", "chars", "fgs", "bgs", "fxs", "clusters", "_damage")
+  chars: array  # code points, EMPTY or CLUSTER
+  fgs: array  # packed colors
+  bgs: array
+  fxs: array  # masks of attributes
+  clusters: Dict[int, str]  # the characters of CLUSTER codes by their index
+  _damage: List[Union[Tuple[int, int], None]]  # the changed columns of each row, from and up to
 
   def __init__(self, rows=None, cols=None):
-    self.canvas = []
+    self._rows = 0
+    self._cols = 0
+    self.chars = array("I")
+    self.fgs = array("I")
+    self.bgs = array("I")
+    self.fxs = array("H")
+    self.clusters = {}
+    self._damage = []
     self.resize(rows=rows, cols=cols)
 
   def __iter__(self):
-    return [cell for row in self.canvas for cell in row]
+    return (self.cell(index) for index in range(len(self.chars)))
+
+  def __getitem__(self, position: Tuple[int, int]) -> Cell:
+    return self.cell(self.index(*position))
+
+  def __setitem__(self, position: Tuple[int, int], cell: Cell):
+    index = self.index(*position)
+    code = self._pack_char(cell.char)
+    if code == CLUSTER:
+      self.clusters[index] = cell.char
+    elif self.chars[index] == CLUSTER:
+      del self.clusters[index]
+    self.chars[index] = code
+    self.fgs[index] = pack_color(cell.fg)
+    self.bgs[index] = pack_color(cell.bg)
+    self.fxs[index] = cell.fx
+    self.damage(position[0], position[1], position[1] + 1)
 
   def __or__(self, other):
-    if not isinstance(other, self.__class__):
+    if not isinstance(other, Canvas):
       return NotImplemented
-    rows = zip(copy.deepcopy(self.canvas), copy.deepcopy(other.canvas))
-    canvas = [[s_cell | o_cell for s_cell, o_cell in zip(s_row, o_row)] for s_row, o_row in rows]
-
     new = self.__class__()
-    new.canvas = canvas
+    new._rows = min(self.rows, other.rows)
+    new._cols = min(self.cols, other.cols)
+    other_chars, other_fgs, other_bgs, _ = self._fields_of(other)
+
+    for row in range(new._rows):
+      start = row * self._cols
+      end = start + new._cols
+      other_start = row * other._cols
+      other_end = other_start + new._cols
+
+      # the upper layer's fields are used unless they are transparent, except for the attributes
+      new.chars += array("I", [
+        code or other_code
+        for code, other_code in zip(self.chars[start:end], other_chars[other_start:other_end])
+      ])
+      new.fgs += array("I", [
+        other_fg if fg == TRANSPARENT else fg
+        for fg, other_fg in zip(self.fgs[start:end], other_fgs[other_start:other_end])
+      ])
+      new.bgs += array("I", [
+        other_bg if bg == TRANSPARENT else bg
+        for bg, other_bg in zip(self.bgs[start:end], other_bgs[other_start:other_end])
+      ])
+      new.fxs += self.fxs[start:end]
+
+    for canvas in (other, self):  # the upper layer's characters go last, over the lower layer's
+      for index, char in canvas.clusters.items():
+        row, column = divmod(index, canvas._cols)
+        if row < new._rows and column < new._cols and new.chars[row * new._cols + column] == CLUSTER:
+          new.clusters[row * new._cols + column] = char
+    new.damage_all()
     return new
 
   @property
   def rows(self) -> int:
-    return len(self.canvas)
+    return self._rows
 
   @property
   def cols(self) -> int:
-    if self.rows == 0:
-      return 0
-    return len(self.canvas[0])
+    return self._cols
+
+  @property
+  def canvas(self) -> Tuple[Tuple[Cell, ...], ...]:
+    """
+    The cells of each row, built on access. They are a copy, so they are tuples to keep them from
+    being edited in place of the canvas, which is done by setting canvas[row, column].
+    """
+    return tuple(
+      tuple(self.cell(index) for index in range(row * self._cols, (row + 1) * self._cols))
+      for row in range(self._rows)
+    )
+
+  def index(self, row: int, column: int) -> int:
+    if not (0 <= row < self._rows and 0 <= column < self._cols):
+      raise IndexError("Position ({}, {}) is outside of the canvas ({}, {})".format(row, column, self._rows, self._cols))
+    return row * self._cols + column
+
+  def cell(self, index: int) -> Cell:
+    """Creates the cell at the index of the arrays."""
+    return intern_cell(self.char(index), unpack_color(self.fgs[index]), unpack_color(self.bgs[index]), self.fxs[index])
+
+  def char(self, index: int) -> str:
+    code = self.chars[index]
+    if code == EMPTY:
+      return ""
+    elif code == CLUSTER:
+      return self.clusters[index]
+    return chr(code)
+
+  @staticmethod
+  def _pack_char(char: str) -> int:
+    if not char:
+      return EMPTY
+    elif len(char) == 1:
+      return ord(char)
+    return CLUSTER
+
+  def copy(self) -> "Canvas":
+    """Creates a new canvas with the same cells, which can be modified independently."""
+    new = self.__class__()
+    new._rows = self._rows
+    new._cols = self._cols
+    new.chars = array("I", self.chars)
+    new.fgs = array("I", self.fgs)
+    new.bgs = array("I", self.bgs)
+    new.fxs = array("H", self.fxs)
+    new.clusters = self.clusters.copy()
+    new._damage = self._damage[:]
+    return new
 
   def resize(self, rows: int = None, cols: int = None, fill: Cell = Cell()):
-    if rows is not None:
-      diff = rows - self.rows
-      if diff > 0:
-        self.canvas += [[fill] * (cols or self.cols)] * diff
-      elif diff < 0:
-        del self.canvas[diff:]  # delete the trailing rows
-
-    if cols is not None:
-      diff = cols - self.cols
-      if diff > 0:
-        for row in self.canvas:
-          row += [fill] * diff
-      elif diff < 0:
-        del row[diff:]  # delete the trailing columns
+    rows = self._rows if rows is None else rows
+    cols = self._cols if cols is None else cols
+    code = self._pack_char(fill.char)
+    packed = (code, pack_color(fill.fg), pack_color(fill.bg), fill.fx)
+
+    if cols != self._cols:
+      # every row moves, so rebuild the arrays a row at a time
+      arrays = (self.chars, self.fgs, self.bgs, self.fxs)
+      resized = tuple(array(field.typecode) for field in arrays)
+      kept = min(cols, self._cols)
+      for row in range(min(rows, self._rows)):
+        start = row * self._cols
+        for field, new_field, value in zip(arrays, resized, packed):
+          new_field += field[start:start + kept]
+          new_field += array(field.typecode, [value]) * (cols - kept)
+      self.chars, self.fgs, self.bgs, self.fxs = resized
+
+      self._resize_clusters(rows, cols, fill)
+      self._rows = min(rows, self._rows)
+      self._cols = cols
+
+    size = rows * cols
+    for field, value in zip((self.chars, self.fgs, self.bgs, self.fxs), packed):
+      if size > len(field):
+        field += array(field.typecode, [value]) * (size - len(field))
+      else:
+        del field[size:]  # delete the trailing rows
+    if self.clusters or code == CLUSTER:
+      self._resize_clusters(rows, cols, fill)
+    self._rows = rows
+    self.damage_all()
+
+  def _resize_clusters(self, rows: int, cols: int, fill: Cell):
+    """Moves the characters of clusters to their indices in the new size, filling any new cells."""
+    clusters = {}
+    for index, char in self.clusters.items():
+      row, column = divmod(index, self._cols)
+      if row < rows and column < cols:
+        clusters[row * cols + column] = char
+
+    if self._pack_char(fill.char) == CLUSTER:
+      for row in range(rows):
+        for column in range(cols):
+          if row >= self._rows or column >= self._cols:
+            clusters[row * cols + column] = fill.char
+    self.clusters = clusters
+
+  def blit(self, other: "Canvas", row: int = 0, column: int = 0):
+    """
+    Copies the cells of the other canvas onto this one, with it's top left at the row and column.
+    Any cells which fall outside of this canvas are left out.
+    """
+    self._blit(other, row, column, (0, 0, self._rows, self._cols))
+
+  def _blit(self, other: "Canvas", row: int, column: int, clip: Tuple[int, int, int, int]):
+    """Blits the other canvas, leaving out cells outside of the clip's top, left, bottom and right."""
+    top, left = max(row, clip[0]), max(column, clip[1])
+    bottom, right = min(row + other._rows, clip[2]), min(column + other._cols, clip[3])
+    if top >= bottom or left >= right:
+      return
+    other_chars, other_fgs, other_bgs, other_fxs = self._fields_of(other)
+
+    for y in range(top, bottom):
+      start = y * self._cols + left
+      end = y * self._cols + right
+      other_start = (y - row) * other._cols + left - column
+      other_end = other_start + right - left
+      for index in range(start, end):
+        self.clusters.pop(index, None)
+      self.chars[start:end] = other_chars[other_start:other_end]
+      self.fgs[start:end] = other_fgs[other_start:other_end]
+      self.bgs[start:end] = other_bgs[other_start:other_end]
+      self.fxs[start:end] = other_fxs[other_start:other_end]
+
+    for index, char in other.clusters.items():
+      y, x = divmod(index, other._cols)
+      if top <= y + row < bottom and left <= x + column < right:
+        self.clusters[(y + row) * self._cols + x + column] = char
+    self._damage_rect(top, left, bottom, right)
+
+  def _fields_of(self, other: "Canvas") -> Tuple[array, array, array, array]:
+    """The packed fields of the other canvas as arrays, converted when it stores them otherwise."""
+    fields = (other.chars, other.fgs, other.bgs, other.fxs)
+    if type(other.chars) is array:
+      return fields
+    return tuple(array(field.typecode, other_field) for field, other_field in zip(
+      (self.chars, self.fgs, self.bgs, self.fxs), fields
+    ))
+
+  def _fill_rect(self, fill: Cell, top: int, left: int, bottom: int, right: int):
+    """Fills the cells from the top left up to the bottom right, which must be within the canvas."""
+    code = self._pack_char(fill.char)
+    width = right - left
+    row_fields = (
+      (self.chars, array("I", [code]) * width),
+      (self.fgs, array("I", [pack_color(fill.fg)]) * width),
+      (self.bgs, array("I", [pack_color(fill.bg)]) * width),
+      (self.fxs, array("H", [fill.fx]) * width),
+    )
+    for y in range(top, bottom):
+      start = y * self._cols + left
+      for field, row_field in row_fields:
+        field[start:start + width] = row_field
+    self._fill_rect_clusters(fill.char, top, left, bottom, right)
+    self._damage_rect(top, left, bottom, right)
+
+  def _fill_rect_clusters(self, char: str, top: int, left: int, bottom: int, right: int):
+    cluster = self._pack_char(char) == CLUSTER
+    if not cluster and not self.clusters:
+      return
+    for y in range(top, bottom):
+      for index in range(y * self._cols + left, y * self._cols + right):
+        if cluster:
+          self.clusters[index] = char
+        else:
+          self.clusters.pop(index, None)
+
+  def view(self, row: int, column: int, rows: int, cols: int) -> "CanvasView":
+    """Makes a view of the rectangle of cells, clipped to the canvas."""
+    return CanvasView(self, row, column, rows, cols)
+
+  # Damage
+  # the range of columns changed in each row is recorded, so that diff only has to look at those
+  def damage(self, row: int, start: int, end: int):
+    """Records that the columns from start up to end of the row have changed."""
+    damaged = self._damage[row]
+    if damaged is None:
+      self._damage[row] = (start, end)
+    elif start < damaged[0] or end > damaged[1]:
+      self._damage[row] = (min(start, damaged[0]), max(end, damaged[1]))
+
+  def _damage_rect(self, top: int, left: int, bottom: int, right: int):
+    for row in range(top, bottom):
+      self.damage(row, left, right)
+
+  def damage_all(self):
+    self._damage = [(0, self._cols)] * self._rows
+
+  def damaged(self) -> List[Tuple[int, int, int]]:
+    """The row and range of columns, from and up to, of every row which has changed."""
+    return [(row, *damaged) for row, damaged in enumerate(self._damage) if damaged is not None]
+
+  def clear_damage(self):
+    self._damage = [None] * self._rows
+
+  # Scrolling
+  def row_hashes(self) -> List[int]:
+    """Hashes the cells of every row, so that rows can be matched up between canvases."""
+    hashes = []
+    for row in range(self._rows):
+      start, end = row * self._cols, (row + 1) * self._cols
+      fields = tuple(field[start:end].tobytes() for field in (self.chars, self.fgs, self.bgs, self.fxs))
+      if self.clusters:
+        fields += tuple(self.clusters.get(index) for index in range(start, end))
+      hashes.append(hash(fields))
+    return hashes
+
+  def find_scroll(self, other: "Canvas") -> Union[Scroll, None]:
+    """
+    Finds the scroll which turns the other canvas into the most of this one, when it saves enough
+    rows from being drawn again. Rows scrolled in are considered blank, and are not counted.
+
+    >>> old = Canvas(4, 3)
+    >>> for row, char in enumerate("abcd"):
+    ...   old.view(row, 0, 1, 3).fill(Cell(char))
+    >>> new = old.copy()
+    >>> new.scroll(0, 4, 1)
+    >>> new.find_scroll(old)
+    Scroll(top=0, bottom=4, amount=1)
+    """
+    if (self._rows, self._cols) != (other._rows, other._cols) or not self._cols:
+      return None
+
+    hashes = self.row_hashes()
+    other_hashes = other.row_hashes()
+    other_rows = {}
+    for row, row_hash in enumerate(other_hashes):
+      other_rows.setdefault(row_hash, []).append(row)
+
+    # every changed row votes for the shifts that would move one of the other's rows into place
+    votes = Counter()
+    for row, row_hash in enumerate(hashes):
+      if row_hash != other_hashes[row]:
+        votes.update(other_row - row for other_row in other_rows.get(row_hash, ()))
+
+    best, best_saved = None, SCROLL_MIN_ROWS - 1
+    for amount, _ in votes.most_common(SCROLL_CANDIDATES):
+      row, end = max(0, -amount), min(self._rows, self._rows - amount)
+      while row < end:
+        if not self._same_row(row, other, row + amount, hashes, other_hashes):
+          row += 1
+          continue
+
+        # the run of rows which would be in place after scrolling
+        start = row
+        while row < end and self._same_row(row, other, row + amount, hashes, other_hashes):
+          row += 1
+        top, bottom = min(start, start + amount), max(row, row + amount)
+        saved = sum(hashes[y] != other_hashes[y] for y in range(start, row))
+        # rows scrolled in are blank, so any which were already in place have to be drawn again
+        blanked = range(row, bottom) if amount > 0 else range(top, start)
+        saved -= sum(hashes[y] == other_hashes[y] for y in blanked)
+        if saved > best_saved:
+          best, best_saved = Scroll(top, bottom, amount), saved
+    return best
+
+  def _same_row(
+    self, row: int, other: "Canvas", other_row: int, hashes: List[int], other_hashes: List[int]
+  ) -> bool:
+    if hashes[row] != other_hashes[other_row]:
+      return False
+    start, other_start = row * self._cols, other_row * other._cols
+    return self._same_cells(start, start + self._cols, other, other_start)
+
+  def scroll(self, top: int, bottom: int, amount: int, fill: Cell = Cell(" ")):
+    """
+    Moves the rows from the top up to the bottom up by the amount, or down if it is negative, the same
+    as a terminal scrolling that region. Rows scrolled in are filled with the fill.
+    """
+    if not amount or top >= bottom:
+      return
+    cols = self._cols
+    moved = bottom - top - abs(amount)
+    if moved > 0:
+      source, dest = (top + amount, top) if amount > 0 else (top, top - amount)
+      for field in (self.chars, self.fgs, self.bgs, self.fxs):
+        field[dest * cols:(dest + moved) * cols] = field[source * cols:(source + moved) * cols]
+      if self.clusters:
+        clusters = {}
+        for index, char in self.clusters.items():
+          row = index // cols
+          if not top <= row < bottom:
+            clusters[index] = char
+          elif source <= row < source + moved:
+            clusters[index + (dest - source) * cols] = char
+        self.clusters = clusters
+
+    if amount > 0:
+      self._fill_rect(fill, max(bottom - amount, top), 0, bottom, cols)
+    else:
+      self._fill_rect(fill, top, 0, min(top - amount, bottom), cols)
+    self._damage_rect(top, 0, bottom, cols)
 
   def draw(self, term: Terminal, mode="relative"):
-    for row in self.canvas:
-      for cell in row:
-        cell.draw(term)
+    if term.stats is not None:
+      transparent = self.chars.tolist().count(EMPTY)
+      term.stats.cells(len(self.chars) - transparent, transparent)
+    for row in range(self._rows):
+      self._draw_row(term, row * self._cols, (row + 1) * self._cols)
       term.move_by(y=1)
       term.move_by(x=-self.cols)
 
-  def diff(self, other):
-    raise NotImplementedError
+  def _draw_row(self, term: Terminal, start: int, end: int):
+    """Draws the cells from start up to end like draw_cells, straight from the packed fields."""
+    chars, fgs, bgs, fxs = (field[start:end].tolist() for field in (self.chars, self.fgs, self.bgs, self.fxs))
+    index, end = 0, len(chars)
+    while index < end:
+      run = index + 1
+      if chars[index] == EMPTY:
+        while run < end and chars[run] == EMPTY:
+          run += 1
+        term.move_by(x=run - index)
+      else:
+        fg, bg, fx = fgs[index], bgs[index], fxs[index]
+        while run < end and chars[run] != EMPTY and fgs[run] == fg and bgs[run] == bg and fxs[run] == fx:
+          run += 1
+        term.set_style(unpack_color(fg), unpack_color(bg), fx)
+        term.write("".join(
+          self.clusters[start + column] if chars[column] == CLUSTER else chr(chars[column])
+          for column in range(index, run)
+        ))
+      index = run
+
+  def _same(self, index: int, other: "Canvas", other_index: int) -> bool:
+    code = self.chars[index]
+    return (
+      code == other.chars[other_index]
+      and self.fgs[index] == other.fgs[other_index]
+      and self.bgs[index] == other.bgs[other_index]
+      and self.fxs[index] == other.fxs[other_index]
+      and (code != CLUSTER or self.clusters[index] == other.clusters[other_index])
+    )
+
+  def _same_cells(self, start: int, end: int, other: "Canvas", other_start: int) -> bool:
+    other_end = other_start + end - start
+    return (
+      self.chars[start:end] == other.chars[other_start:other_end]
+      and self.fgs[start:end] == other.fgs[other_start:other_end]
+      and self.bgs[start:end] == other.bgs[other_start:other_end]
+      and self.fxs[start:end] == other.fxs[other_start:other_end]
+      and (not self.clusters or CLUSTER not in self.chars[start:end])
+    )
+
+  def diff(self, other: "Canvas", damaged_only: bool = False) -> List[Span]:
+    """
+    Computes the spans of cells in this canvas which differ from the other canvas, which is usually
+    the canvas that was last drawn to the terminal.
+    Cells which fall outside of the other canvas are always considered changed.
+    If damaged_only is set, only the damaged cells are compared, which is for when the damage was cleared
+    while this canvas was the same as the other.
+    """
+    spans = []
+    cols = self._cols
+    shared = min(cols, other._cols)
+    damaged_only = damaged_only and cols == other._cols
+    for y in range(self._rows):
+      start = y * cols
+      end = start + cols
+      if y >= other._rows:
+        spans.append(Span(y, 0, [self.cell(index) for index in range(start, end)]))
+        continue
+
+      first, last = 0, cols
+      if damaged_only:
+        if self._damage[y] is None:
+          continue
+        first, last = self._damage[y]
+
+      other_start = y * other._cols
+      # unchanged rows are skipped over by comparing the arrays of the whole row at once
+      if cols == other._cols and self._same_cells(start + first, start + last, other, other_start + first):
+        continue
+
+      span_start = None
+      for x in range(first, last):
+        changed = x >= shared or not self._same(start + x, other, other_start + x)
+        if changed and span_start is None:
+          span_start = x
+        elif not changed and span_start is not None:
+          spans.append(Span(y, span_start, [self.cell(start + i) for i in range(span_start, x)]))
+          span_start = None
+      if span_start is not None:
+        spans.append(Span(y, span_start, [self.cell(start + i) for i in range(span_start, last)]))
+
+    return spans
+
+  def draw_spans(self, term: Terminal, spans: Iterable[Span], row: int = 0, column: int = 0):
+    """
+    Draws only the given spans, such as those returned by diff, moving the cursor directly to each
+    of them. The row and column specify where the top left of the canvas is on the terminal.
+    """
+    if term.stats is not None:
+      spans = list(spans)
+      drawn = sum(len(span.cells) for span in spans)
+      term.stats.cells(drawn, len(self.chars) - drawn)
+
+    last = None  # the span drawn before, and the style of it's last cell
+    for span in spans:
+      text = None
+      if last is not None and last[0].row == span.row:
+        # short gaps of unchanged cells may be cheaper to print again than to move over
+        start = span.row * self._cols
+        gap_start = last[0].column + len(last[0].cells)
+        if span.column - gap_start <= REPRINT_GAP:
+          gap = [self.cell(start + x) for x in range(gap_start, span.column)]
+          if all(
+            len(cell.char) == 1 and is_narrow(cell.char) and cell_style(cell) == last[1] for cell in gap
+          ):
+            text = "".join(cell.char for cell in gap)
+
+      term.move_to(row + span.row, column + span.column, text)
+      draw_cells(term, span.cells)
+      last = (span, cell_style(span.cells[-1]) if span.cells[-1].char else None)
+
+  def fill(self, fill: Cell):
+    self.damage_all()
+    size = len(self.chars)
+    code = self._pack_char(fill.char)
+    self.chars = array("I", [code]) * size
+    self.fgs = array("I", [pack_color(fill.fg)]) * size
+    self.bgs = array("I", [pack_color(fill.bg)]) * size
+    self.fxs = array("H", [fill.fx]) * size
+    self.clusters = dict.fromkeys(range(size), fill.char) if code == CLUSTER else {}
+
+class NumpyCanvas(Canvas):
+  """
+  A canvas stored in numpy arrays, so that layering, filling, resizing and blitting work on whole
+  planes of the canvas at once. Requires numpy to be installed.
+  """
+  __slots__ = ()
+
+  def __init__(self, rows=None, cols=None):
+    if numpy is None:
+      raise ImportError("NumpyCanvas requires numpy")
+    self._rows = 0
+    self._cols = 0
+    self.chars = numpy.zeros(0, numpy.uint32)
+    self.fgs = numpy.zeros(0, numpy.uint32)
+    self.bgs = numpy.zeros(0, numpy.uint32)
+    self.fxs = numpy.zeros(0, numpy.uint16)
+    self.clusters = {}
+    self._damage = []
+    self.resize(rows=rows, cols=cols)
+
+  def planes(self) -> Tuple["numpy.ndarray", ...]:
+    """Two dimensional views of the chars, fgs, bgs and fxs arrays, indexed by row then column."""
+    shape = (self._rows, self._cols)
+    return tuple(field.reshape(shape) for field in (self.chars, self.fgs, self.bgs, self.fxs))
+
+  def __or__(self, other):
+    if not isinstance(other, Canvas):
+      return NotImplemented
+    rows = min(self.rows, other.rows)
+    cols = min(self.cols, other.cols)
+    chars, fgs, bgs, fxs = (plane[:rows, :cols] for plane in self.planes())
+    # the other canvas may store it's fields in arrays, which numpy reads without copying
+    other_chars, other_fgs, other_bgs = (
+      numpy.asarray(field).reshape((other._rows, other._cols))[:rows, :cols]
+      for field in (other.chars, other.fgs, other.bgs)
+    )
+
+    # the upper layer's fields are used unless they are transparent, except for the attributes
+    new = self.__class__()
+    new._rows = rows
+    new._cols = cols
+    new.chars = numpy.where(chars != EMPTY, chars, other_chars).ravel()
+    new.fgs = numpy.where(fgs != TRANSPARENT, fgs, other_fgs).ravel()
+    new.bgs = numpy.where(bgs != TRANSPARENT, bgs, other_bgs).ravel()
+    new.fxs = fxs.copy().ravel()
+
+    for canvas in (other, self):
+      for index, char in canvas.clusters.items():
+        row, column = divmod(index, canvas._cols)
+        if row < rows and column < cols and new.chars[row * cols + column] == CLUSTER:
+          new.clusters[row * cols + column] = char
+    new.damage_all()
+    return new
+
+  def cell(self, index: int) -> Cell:
+    # numpy scalars are turned into ints, as colors are told apart from palette ids by their type
+    return intern_cell(
+      self.char(index),
+      unpack_color(int(self.fgs[index])),
+      unpack_color(int(self.bgs[index])),
+      int(self.fxs[index]),
+    )
+
+  def copy(self) -> "NumpyCanvas":
+    new = self.__class__()
+    new._rows = self._rows
+    new._cols = self._cols
+    new.chars = self.chars.copy()
+    new.fgs = self.fgs.copy()
+    new.bgs = self.bgs.copy()
+    new.fxs = self.fxs.copy()
+    new.clusters = self.clusters.copy()
+    new._damage = self._damage[:]
+    return new
+
+  def resize(self, rows: int = None, cols: int = None, fill: Cell = Cell()):
+    rows = self._rows if rows is None else rows
+    cols = self._cols if cols is None else cols
+    packed = (self._pack_char(fill.char), pack_color(fill.fg), pack_color(fill.bg), fill.fx)
+
+    kept_rows = min(rows, self._rows)
+    kept_cols = min(cols, self._cols)
+    resized = []
+    for plane, value in zip(self.planes(), packed):
+      new_plane = numpy.full((rows, cols), value, plane.dtype)
+      new_plane[:kept_rows, :kept_cols] = plane[:kept_rows, :kept_cols]
+      resized.append(new_plane.ravel())
+
+    if self.clusters or packed[0] == CLUSTER:
+      self._resize_clusters(rows, cols, fill)
+    self.chars, self.fgs, self.bgs, self.fxs = resized
+    self._rows = rows
+    self._cols = cols
+    self.damage_all()
+
+  def _blit(self, other: "Canvas", row: int, column: int, clip: Tuple[int, int, int, int]):
+    top, left = max(row, clip[0]), max(column, clip[1])
+    bottom, right = min(row + other._rows, clip[2]), min(column + other._cols, clip[3])
+    if top >= bottom or left >= right:
+      return
+
+    shape = (other._rows, other._cols)
+    other_fields = (other.chars, other.fgs, other.bgs, other.fxs)
+    for plane, field in zip(self.planes(), other_fields):
+      plane[top:bottom, left:right] = numpy.asarray(field).reshape(shape)[
+        top - row:bottom - row, left - column:right - column
+      ]
+
+    for index in [index for index in self.clusters if index // self._cols in range(top, bottom)]:
+      if left <= index % self._cols < right:
+        del self.clusters[index]
+    for index, char in other.clusters.items():
+      y, x = divmod(index, other._cols)
+      if top <= y + row < bottom and left <= x + column < right:
+        self.clusters[(y + row) * self._cols + x + column] = char
+    self._damage_rect(top, left, bottom, right)
+
+  def _fill_rect(self, fill: Cell, top: int, left: int, bottom: int, right: int):
+    packed = (self._pack_char(fill.char), pack_color(fill.fg), pack_color(fill.bg), fill.fx)
+    for plane, value in zip(self.planes(), packed):
+      plane[top:bottom, left:right] = value
+    self._fill_rect_clusters(fill.char, top, left, bottom, right)
+    self._damage_rect(top, left, bottom, right)
+
+  def fill(self, fill: Cell):
+    self.damage_all()
+    code = self._pack_char(fill.char)
+    self.chars.fill(code)
+    self.fgs.fill(pack_color(fill.fg))
+    self.bgs.fill(pack_color(fill.bg))
+    self.fxs.fill(fill.fx)
+    self.clusters = dict.fromkeys(range(len(self.chars)), fill.char) if code == CLUSTER else {}
+
+  def _same_cells(self, start: int, end: int, other: "Canvas", other_start: int) -> bool:
+    other_end = other_start + end - start
+    return (
+      numpy.array_equal(self.chars[start:end], other.chars[other_start:other_end])
+      and numpy.array_equal(self.fgs[start:end], other.fgs[other_start:other_end])
+      and numpy.array_equal(self.bgs[start:end], other.bgs[other_start:other_end])
+      and numpy.array_equal(self.fxs[start:end], other.fxs[other_start:other_end])
+      and (not self.clusters or not (self.chars[start:end] == CLUSTER).any())
+    )
+
+  def diff(self, other: "Canvas", damaged_only: bool = False) -> List[Span]:
+    if not isinstance(other, NumpyCanvas) or (self._rows, self._cols) != (other._rows, other._cols):
+      return super().diff(other, damaged_only)
+
+    # compare every cell at once, then find where each run of changed cells starts and ends
+    changed = (
+      (self.chars != other.chars)
+      | (self.fgs != other.fgs)
+      | (self.bgs != other.bgs)
+      | (self.fxs != other.fxs)
+    )
+    for index, char in self.clusters.items():
+      if char != other.clusters.get(index):
+        changed[index] = True
+
+    spans = []
+    rows = changed.reshape((self._rows, self._cols))
+    if damaged_only:
+      rows[[damage is None for damage in self._damage]] = False
+    for y in numpy.flatnonzero(rows.any(axis=1)):
+      y = int(y)
+      edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], rows[y].view(numpy.int8), [0]))))
+      for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        first = y * self._cols
+        spans.append(Span(y, start, [self.cell(first + x) for x in range(start, end)]))
+    return spans
+
+class CanvasView():
+  """
+  A rectangle of a canvas, which reads and writes the cells of the canvas directly, recording damage
+  in the canvas. Views are clipped to the canvas or view they are made from, and positions within
+  them count from their top left.
+  """
+  __slots__ = ("parent", "top", "left", "_rows", "_cols")
+
+  def __init__(self, parent: Union[Canvas, "CanvasView"], row: int, column: int, rows: int, cols: int):
+    # views of views are made straight on the canvas, so writes never go through more than one view
+    top, left = max(row, 0), max(column, 0)
+    bottom, right = min(row + rows, parent.rows), min(column + cols, parent.cols)
+    if isinstance(parent, CanvasView):
+      top += parent.top
+      left += parent.left
+      parent = parent.parent
+
+    self.parent = parent
+    self.top = top
+    self.left = left
+    self._rows = max(bottom - max(row, 0), 0)
+    self._cols = max(right - max(column, 0), 0)
+
+  def __iter__(self):
+    return (self[row, column] for row in range(self._rows) for column in range(self._cols))
+
+  def __getitem__(self, position: Tuple[int, int]) -> Cell:
+    return self.parent[self._position(*position)]
+
+  def __setitem__(self, position: Tuple[int, int], cell: Cell):
+    self.parent[self._position(*position)] = cell
+
+  @property
+  def rows(self) -> int:
+    return self._rows
+
+  @property
+  def cols(self) -> int:
+    return self._cols
+
+  def _position(self, row: int, column: int) -> Tuple[int, int]:
+    if not (0 <= row < self._rows and 0 <= column < self._cols):
+      raise IndexError("Position ({}, {}) is outside of the view ({}, {})".format(row, column, self._rows, self._cols))
+    return (self.top + row, self.left + column)
+
+  def view(self, row: int, column: int, rows: int, cols: int) -> "CanvasView":
+    return CanvasView(self, row, column, rows, cols)
+
+  def blit(self, other: Canvas, row: int = 0, column: int = 0):
+    clip = (self.top, self.left, self.top + self._rows, self.left + self._cols)
+    self.parent._blit(other, self.top + row, self.left + column, clip)
 
   def fill(self, fill: Cell):
-    self.canvas = [[fill for _ in row] for row in self.canvas]
+    if self._rows and self._cols:
+      self.parent._fill_rect(fill, self.top, self.left, self.top + self._rows, self.left + self._cols)
 
+# the fastest canvas which can be used
+FastCanvas = Canvas if numpy is None else NumpyCanvas
 
+if __name__ == "__main__":
+  import doctest
+  doctest.testmod()
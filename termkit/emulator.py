@@ -0,0 +1,397 @@
+"""
+A headless terminal emulator, which interprets the sequences Terminal sends into a grid of cells.
+It covers what termkit emits, so renderers can be tested and measured without a tty, such as by
+checking an optimized frame leaves the same cells as drawing everything again.
+"""
+
+import re
+
+from typing import List, Tuple, Union
+
+from . import style
+from .canvas import Canvas, Cell
+from .style import Color
+
+__all__ = ["Emulator"]
+
+# control sequences, operating system commands, other escapes, control characters, then text
+TOKEN = re.compile(
+  r"\x1b\[(?P<params>[\x30-\x3f]*)(?P<csi_inter>[\x20-\x2f]*)(?P<csi>[\x40-\x7e])"
+  r"|\x1b\](?P<osc>[^\x07\x1b]*)(?:\x07|\x1b\\|(?=\x1b[^\\]))"  # an escape also cuts the command off
+  r"|\x1b(?P<esc_inter>[\x20-\x2f]*)(?P<esc>[\x30-\x5a\x5c\x5e-\x7e])"
+  r"|(?P<control>[\x00-\x1a\x1c-\x1f\x7f])"
+  r"|(?P<text>[^\x00-\x1f\x7f]+)"
+)
+# an escape which doesn't match after this many characters is never going to
+MAX_PENDING = 256
+
+# select graphic rendition parameters of each attribute, and the attributes each reset parameter clears
+SGR_SET = {
+  1: style.BOLD, 2: style.DIM, 3: style.ITALIC, 4: style.UNDERLINE, 5: style.BLINK, 7: style.REVERSE,
+  8: style.CONCEAL, 9: style.STRIKE,
+}
+SGR_RESET = {
+  22: style.BOLD | style.DIM, 23: style.ITALIC, 24: style.UNDERLINE, 25: style.BLINK,
+  27: style.REVERSE, 28: style.CONCEAL, 29: style.STRIKE,
+}
+
+class Emulator:
+  """
+  A virtual screen of rows by columns, written to like the output stream of a Terminal.
+  Colors are kept as they were sent, an int for palette colors and a Color for truecolor, and cells
+  in the line drawing character set or a hyperlink have CHARSET or HYPERLINK set.
+  Cells which were never written are blank spaces.
+
+  >>> from termkit.term import Terminal
+  >>> emulator = Emulator(2, 5)
+  >>> term = Terminal(None, emulator, colors=256)
+  >>> term.move_to(1, 2)
+  >>> term.fg(9)
+  >>> term.write("hi")
+  >>> emulator.lines()
+  ['     ', '  hi ']
+  >>> emulator[1, 2]
+  Cell(char='h', fg=9, bg=None, fx=0)
+  """
+  encoding = "utf-8"
+
+  def __init__(self, rows: int = 24, cols: int = 80):
+    self.rows = rows
+    self.cols = cols
+    self.bytes = 0  # the number of bytes written, as encoded by the terminal
+    self.responses = ""  # what the terminal would have sent back, such as cursor reports
+    self.reset()
+
+  def reset(self):
+    """Resets the terminal to it's initial state, with a blank screen."""
+    self.grid = self._blank_grid()
+    self._other_grid = None  # the main screen while the alternate screen is shown
+    self.alternate = False
+    self.row = self.column = 0
+    self._wrap = False  # the last column was written, so the next character goes on the next line
+    self.autowrap = True
+    self.cursor_visible = True
+    self.synchronized = False
+    self.title = ""
+    self._soft_reset()
+    self._pending = ""
+
+  def _soft_reset(self):
+    self.fg = self.bg = None
+    self.fx = 0
+    self.link = ""
+    self.top, self.bottom = 0, self.rows  # the scroll region, from and up to
+    self._charsets = ["B", "B"]
+    self._shift = 0  # which of the charsets is in use
+    self._saved = (0, 0, None, None, 0, ("B", "B"), 0)
+
+  def __getitem__(self, position: Tuple[int, int]) -> Cell:
+    row, column = position
+    return self.grid[row][column]
+
+  @property
+  def cursor(self) -> Tuple[int, int]:
+    return (self.row, self.column)
+
+  def lines(self) -> List[str]:
+    """The characters on the screen of each row."""
+    return ["".join(cell.char for cell in row) for row in self.grid]
+
+  def to_canvas(self) -> Canvas:
+    """Copies the screen into a canvas of the same size."""
+    canvas = Canvas(self.rows, self.cols)
+    for row, cells in enumerate(self.grid):
+      for column, cell in enumerate(cells):
+        canvas[row, column] = cell
+    return canvas
+
+  # Output stream
+  def write(self, text: str) -> int:
+    self.bytes += len(text.encode(self.encoding))
+    data = self._pending + text
+    self._pending = ""
+    position = 0
+    while position < len(data):
+      match = TOKEN.match(data, position)
+      if match is None:
+        # an escape which may be completed by the next write
+        if len(data) - position < MAX_PENDING:
+          self._pending = data[position:]
+          break
+        position += 1
+        continue
+
+      position = match.end()
+      kind = match.lastgroup
+      if kind == "text":
+        self._print(match.group("text"))
+      elif kind == "control":
+        self._control(match.group("control"))
+      elif kind == "csi":
+        self._csi(match.group("params"), match.group("csi_inter"), match.group("csi"))
+      elif kind == "esc":
+        self._escape(match.group("esc_inter"), match.group("esc"))
+      else:
+        self._osc(match.group("osc"))
+    return len(text)
+
+  def flush(self):
+    pass
+
+  # Text
+  def _print(self, text: str):
+    fx = self.fx
+    if self._charsets[self._shift] == "0":
+      fx |= style.CHARSET
+    if self.link:
+      fx |= style.HYPERLINK
+    cell_fg, cell_bg = self.fg, self.bg
+    for char in text:
+      if self._wrap:
+        self._wrap = False
+        self.column = 0
+        self._linefeed()
+      self.grid[self.row][self.column] = Cell(char, cell_fg, cell_bg, fx)
+      if self.column == self.cols - 1:
+        self._wrap = self.autowrap
+      else:
+        self.column += 1
+
+  def _control(self, char: str):
+    if char == "\r":
+      self.column = 0
+    elif char in "\n\x0b\x0c":
+      self._linefeed()
+    elif char == "\b":
+      self.column = max(self.column - 1, 0)
+    elif char == "\t":
+      self.column = min((self.column // 8 + 1) * 8, self.cols - 1)
+    elif char == "\x0e":
+      self._shift = 1
+    elif char == "\x0f":
+      self._shift = 0
+    else:
+      return  # the bell and other controls leave the cursor alone
+    self._wrap = False
+
+  def _linefeed(self):
+    if self.row == self.bottom - 1:
+      self._scroll_up(1)
+    elif self.row < self.rows - 1:
+      self.row += 1
+
+  # Escapes
+  def _escape(self, intermediates: str, final: str):
+    if intermediates in ("(", ")"):
+      self._charsets["()".index(intermediates)] = final
+    elif intermediates:
+      return
+    elif final == "7":
+      self._saved = (self.row, self.column, self.fg, self.bg, self.fx, tuple(self._charsets), self._shift)
+    elif final == "8":
+      self.row, self.column, self.fg, self.bg, self.fx, charsets, self._shift = self._saved
+      self._charsets = list(charsets)
+      self._wrap = False
+    elif final == "c":
+      self.reset()
+    elif final == "D":
+      self._linefeed()
+    elif final == "E":
+      self.column = 0
+      self._linefeed()
+    elif final == "M":
+      if self.row == self.top:
+        self._scroll_down(1)
+      elif self.row > 0:
+        self.row -= 1
+
+  def _osc(self, command: str):
+    number, _, text = command.partition(";")
+    if number == "8":
+      self.link = text.partition(";")[2]
+    elif number in ("0", "2"):
+      self.title = text
+
+  # Control sequences
+  def _csi(self, params: str, intermediates: str, final: str):
+    private = params[:1] if params[:1] in "<=>?" else ""
+    numbers = [int(param) if param.isdigit() else 0 for param in params[len(private):].split(";")]
+    amount = max(numbers[0], 1)
+
+    if private == "?":
+      if final in "hl":
+        self._mode(numbers, final == "h")
+      return
+    if private or (intermediates and final != "p"):
+      return
+
+    if final == "m":
+      self._sgr(numbers)
+      return
+    if final == "p":
+      if intermediates == "!":
+        self._soft_reset()
+      return
+
+    self._wrap = False
+    if final == "A":
+      self.row = max(self.row - amount, self.top if self.row >= self.top else 0)
+    elif final == "B":
+      self.row = min(self.row + amount, self.bottom - 1 if self.row < self.bottom else self.rows - 1)
+    elif final == "C":
+      self.column = min(self.column + amount, self.cols - 1)
+    elif final == "D":
+      self.column = max(self.column - amount, 0)
+    elif final == "E":
+      self.row, self.column = min(self.row + amount, self.rows - 1), 0
+    elif final == "F":
+      self.row, self.column = max(self.row - amount, 0), 0
+    elif final in "G`":
+      self.column = min(amount, self.cols) - 1
+    elif final == "d":
+      self.row = min(amount, self.rows) - 1
+    elif final in "Hf":
+      self.row = min(amount, self.rows) - 1
+      self.column = min(max(numbers[1], 1) if len(numbers) > 1 else 1, self.cols) - 1
+    elif final == "J":
+      self._erase_display(numbers[0])
+    elif final == "K":
+      self._erase_line(numbers[0])
+    elif final == "L":
+      if self.top <= self.row < self.bottom:
+        self._scroll_down(amount, self.row)
+        self.column = 0
+    elif final == "M":
+      if self.top <= self.row < self.bottom:
+        self._scroll_up(amount, self.row)
+        self.column = 0
+    elif final == "S":
+      self._scroll_up(amount)
+    elif final == "T" and len(numbers) == 1:
+      self._scroll_down(amount)
+    elif final == "@":
+      line = self.grid[self.row]
+      line[self.column:] = ([self._blank()] * amount + line[self.column:])[:self.cols - self.column]
+    elif final == "P":
+      line = self.grid[self.row]
+      line[self.column:] = (line[self.column + amount:] + [self._blank()] * amount)[:self.cols - self.column]
+    elif final == "X":
+      line = self.grid[self.row]
+      end = min(self.column + amount, self.cols)
+      line[self.column:end] = [self._blank()] * (end - self.column)
+    elif final == "r":
+      top = max(numbers[0], 1) - 1
+      bottom = min(numbers[1], self.rows) if len(numbers) > 1 and numbers[1] else self.rows
+      if top < bottom - 1:
+        self.top, self.bottom = top, bottom
+        self.row = self.column = 0
+    elif final == "s":
+      self._escape("", "7")
+    elif final == "u":
+      self._escape("", "8")
+    elif final == "n" and numbers[0] == 6:
+      self.responses += "\x1b[{};{}R".format(self.row + 1, self.column + 1)
+
+  def _mode(self, modes: List[int], state: bool):
+    for mode in modes:
+      if mode == 7:
+        self.autowrap = state
+      elif mode == 25:
+        self.cursor_visible = state
+      elif mode == 2026:
+        self.synchronized = state
+      elif mode in (47, 1047, 1049) and state != self.alternate:
+        if mode == 1049 and state:
+          self._escape("", "7")
+        if state:
+          self._other_grid, self.grid = self.grid, self._blank_grid()
+        else:
+          self.grid, self._other_grid = self._other_grid, None
+        self.alternate = state
+        if mode == 1049 and not state:
+          self._escape("", "8")
+
+  def _sgr(self, numbers: List[int]):
+    index = 0
+    while index < len(numbers):
+      number = numbers[index]
+      index += 1
+      if number == 0:
+        self.fg = self.bg = None
+        self.fx = 0
+      elif number in SGR_SET:
+        self.fx |= SGR_SET[number]
+      elif number in SGR_RESET:
+        self.fx &= ~SGR_RESET[number]
+      elif 30 <= number <= 37:
+        self.fg = number - 30
+      elif 40 <= number <= 47:
+        self.bg = number - 40
+      elif 90 <= number <= 97:
+        self.fg = number - 90 + 8
+      elif 100 <= number <= 107:
+        self.bg = number - 100 + 8
+      elif number == 39:
+        self.fg = None
+      elif number == 49:
+        self.bg = None
+      elif number in (38, 48):
+        color, index = self._extended_color(numbers, index)
+        if number == 38:
+          self.fg = color
+        else:
+          self.bg = color
+
+  @staticmethod
+  def _extended_color(numbers: List[int], index: int) -> Tuple[Union[Color, int, None], int]:
+    """Reads the 256 color or truecolor parameters following 38 or 48."""
+    kind = numbers[index] if index < len(numbers) else None
+    if kind == 5 and index + 1 < len(numbers):
+      return (numbers[index + 1], index + 2)
+    if kind == 2 and index + 3 < len(numbers):
+      return (Color(*numbers[index + 1:index + 4]), index + 4)
+    return (None, len(numbers))
+
+  # Editing
+  def _blank(self) -> Cell:
+    return Cell(" ", bg=self.bg)
+
+  def _blank_line(self) -> List[Cell]:
+    return [self._blank()] * self.cols
+
+  def _blank_grid(self) -> List[List[Cell]]:
+    return [[Cell(" ")] * self.cols for _ in range(self.rows)]
+
+  def _scroll_up(self, amount: int, top: Union[int, None] = None):
+    """Moves the lines from the top to the bottom of the scroll region up, adding blank lines."""
+    top = self.top if top is None else top
+    amount = min(amount, self.bottom - top)
+    del self.grid[top:top + amount]
+    self.grid[self.bottom - amount:self.bottom - amount] = [self._blank_line() for _ in range(amount)]
+
+  def _scroll_down(self, amount: int, top: Union[int, None] = None):
+    top = self.top if top is None else top
+    amount = min(amount, self.bottom - top)
+    del self.grid[self.bottom - amount:self.bottom]
+    self.grid[top:top] = [self._blank_line() for _ in range(amount)]
+
+  def _erase_display(self, mode: int):
+    if mode == 0:
+      self._erase_line(0)
+      rows = range(self.row + 1, self.rows)
+    elif mode == 1:
+      self._erase_line(1)
+      rows = range(0, self.row)
+    else:
+      rows = range(self.rows)
+    for row in rows:
+      self.grid[row] = self._blank_line()
+
+  def _erase_line(self, mode: int):
+    line = self.grid[self.row]
+    start, end = {0: (self.column, self.cols), 1: (0, self.column + 1)}.get(mode, (0, self.cols))
+    line[start:end] = [self._blank()] * (end - start)
+
+if __name__ == "__main__":
+  import doctest
+  doctest.testmod()
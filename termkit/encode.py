@@ -0,0 +1,114 @@
+"""
+Escape sequences precomputed for the parameters used the most, so rendering looks them up instead of
+formatting the templates in escape for every cell and movement.
+Parameters past the cached range fall back to formatting.
+"""
+
+import functools
+
+from typing import Iterable
+
+from . import escape
+from .style import Color
+
+__all__ = [
+  "cursor_up", "cursor_down", "cursor_right", "cursor_left", "move_column", "move_row", "move_cursor",
+  "indexed_color", "basic_color", "true_color", "sgr",
+]
+
+# movements are cached up to this amount, which covers the width and height of most screens
+CACHE_SIZE = 1024
+
+def _param(amount: int) -> str:
+  """Parameters of 1 can be left out of cursor sequences, as that is their default."""
+  return "" if amount == 1 else str(amount)
+
+def _table(template: str, name: str, param=_param):
+  return tuple(template.format(**{name: param(amount)}) for amount in range(CACHE_SIZE))
+
+CURSOR_UP = _table(escape.CURSOR_UP, "amount")
+CURSOR_DOWN = _table(escape.CURSOR_DOWN, "amount")
+CURSOR_RIGHT = _table(escape.CURSOR_RIGHT, "amount")
+CURSOR_LEFT = _table(escape.CURSOR_LEFT, "amount")
+MOVE_COLUMN = _table(escape.MOVE_COLUMN, "column")
+MOVE_ROW = _table(escape.MOVE_ROW, "row", str)
+
+def cursor_up(amount: int) -> str:
+  return CURSOR_UP[amount] if amount < CACHE_SIZE else escape.CURSOR_UP.format(amount=amount)
+
+def cursor_down(amount: int) -> str:
+  return CURSOR_DOWN[amount] if amount < CACHE_SIZE else escape.CURSOR_DOWN.format(amount=amount)
+
+def cursor_right(amount: int) -> str:
+  return CURSOR_RIGHT[amount] if amount < CACHE_SIZE else escape.CURSOR_RIGHT.format(amount=amount)
+
+def cursor_left(amount: int) -> str:
+  return CURSOR_LEFT[amount] if amount < CACHE_SIZE else escape.CURSOR_LEFT.format(amount=amount)
+
+def move_column(column: int) -> str:
+  """Moves to the column, counting from one."""
+  return MOVE_COLUMN[column] if column < CACHE_SIZE else escape.MOVE_COLUMN.format(column=column)
+
+def move_row(row: int) -> str:
+  """Moves to the row, counting from one."""
+  return MOVE_ROW[row] if row < CACHE_SIZE else escape.MOVE_ROW.format(row=row)
+
+@functools.lru_cache(maxsize=4 * CACHE_SIZE)
+def move_cursor(row: int, column: int) -> str:
+  """
+  Moves to the row and column, counting from one.
+
+  >>> move_cursor(3, 1)
+  '\\x1b[3;H'
+  """
+  return escape.MOVE_CURSOR.format(row=row, column=_param(column))
+
+# select graphic rendition parameters of colors, by the layer of the color, which is 3 for fg and 4 for bg
+INDEXED_COLORS = {layer: tuple("{}8;5;{}".format(layer, color) for color in range(256)) for layer in (3, 4)}
+# the bright colors are set by their own codes, fg 9x and bg 10x, taking digits from 0-7
+BASIC_COLORS = {
+  layer: tuple("{}{}".format(layer, color) for color in range(8))
+  + tuple("{}{}".format(layer + 6, color) for color in range(8))
+  for layer in (3, 4)
+}
+DEFAULT_COLORS = {layer: "{}9".format(layer) for layer in (3, 4)}
+TRUE_COLORS = {layer: "{}8;2".format(layer) for layer in (3, 4)}
+CHANNELS = tuple(";{}".format(channel) for channel in range(256))
+
+def indexed_color(color: int, layer: int) -> str:
+  """
+  The parameters of a color of the 256 color palette.
+
+  >>> indexed_color(208, 4)
+  '48;5;208'
+  """
+  try:
+    return INDEXED_COLORS[layer][color]
+  except IndexError:
+    return "{}8;5;{}".format(layer, color)
+
+def basic_color(color: int, layer: int) -> str:
+  """The parameters of one of the 16 basic colors, where 8-15 are the bright ones."""
+  return BASIC_COLORS[layer][color]
+
+def true_color(color: Color, layer: int) -> str:
+  """
+  The parameters of a truecolor.
+
+  >>> true_color(Color(255, 128, 0), 3)
+  '38;2;255;128;0'
+  """
+  try:
+    return TRUE_COLORS[layer] + CHANNELS[color.red] + CHANNELS[color.green] + CHANNELS[color.blue]
+  except IndexError:
+    return "{}8;2;{};{};{}".format(layer, color.red, color.green, color.blue)
+
+SGR_START, SGR_END = escape.SGR.split("{params}")
+
+def sgr(params: Iterable[str]) -> str:
+  """Combines select graphic rendition parameters into a single sequence."""
+  return SGR_START + ";".join(params) + SGR_END
+
+if __name__ == "__main__":
+  import doctest
+  doctest.testmod()
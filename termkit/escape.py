@@ -31,6 +31,22 @@ class Key():
   value: str
   modifiers: int = 0
 
+@dataclass(init=True, eq=True, order=False, frozen=True)
+class MouseKey(Key):
+  """
+  A mouse button press, release or movement at a position on the terminal, counting from 0.
+  Buttons 0-2 are left, middle and right, 3 is none, 4 and 5 are the wheel and 8 onwards are extra.
+  """
+  button: int = 0
+  row: int = 0
+  column: int = 0
+
+@dataclass(init=True, eq=True, order=False, frozen=True)
+class CursorKey(Key):
+  """A report of the cursor position on the terminal, counting from 0."""
+  row: int = 0
+  column: int = 0
+
 
 # https://invisible-island.net/xterm/ctlseqs/ctlseqs.html
 
@@ -69,9 +85,11 @@ BUFFER = Feature("\x1b[?1049h", "\x1b[?1049l")
 KEYPAD = Feature("\x1b[?1h\x1b=", "\x1b[?1l\x1b>")
 STATUS = Feature("\x1b]0;{text}\x1b\\", "")  # There is no way to reset the status line
 PASTE = Feature("\x1b[?2004h", "\x1b[?2004l")
+SYNC = Feature("\x1b[?2026h", "\x1b[?2026l")  # synchronized output, shown at once when reset
 
 # Cursor manipulation
 MOVE_CURSOR = "\x1b[{row};{column}H"
+HOME_CURSOR = "\x1b[H"
 MOVE_COLUMN = "\x1b[{column}G"
 MOVE_ROW = "\x1b[{row}d"
 CURSOR_UP = "\x1b[{amount}A"
@@ -111,6 +129,7 @@ STRIKE = Feature("\x1b[9m", "\x1b[29m")
 CHARSET = Feature("\x1b(0\x0f", "\x1b(B\x0f")
 HYPERLINK = Feature("\x1b]8;;{link}\x1b\\", "\x1b]8;;\x1b\\")  # older terminals do not like this
 RESET_STYLE = "\x1b(B\x1b[m"
+SGR = "\x1b[{params}m"  # select graphic rendition, params are any of the above joined with ";"
 CHARSET_TABLE = [
   ("j", u"\u2518"),
   ("k", u"\u2510"),
@@ -130,12 +149,12 @@ CHARSET_TABLE = [
 FGCOLOR_8 = "\x1b[3{color}m"  # color = 0-7
 FGCOLOR_16 = "\x1b[9{color}m"  # color = 0-7 (real values of 8-15)
 FGCOLOR_256 = "\x1b[38;5;{color}m"  # color = 0-255
-FGCOLOR_TRUE = "\x1b[38;2;{red};{blue};{green}m"  # red, blue, green = 0-255
+FGCOLOR_TRUE = "\x1b[38;2;{red};{green};{blue}m"  # red, green, blue = 0-255
 RESET_FGCOLOR = "\x1b[39m"
 BGCOLOR_8 = "\x1b[4{color}m"  # color = 0-7
 BGCOLOR_16 = "\x1b[10{color}m"  # color = 0-7 (real values 8-15)
 BGCOLOR_256 = "\x1b[48;5;{color}m"  # color = 0-255
-BGCOLOR_TRUE = "\x1b[48;2;{red};{blue};{green}m"  # red, blue, green = 0-255
+BGCOLOR_TRUE = "\x1b[48;2;{red};{green};{blue}m"  # red, green, blue = 0-255
 RESET_BGCOLOR = "\x1b[49m"
 COLOR_PAIR = Feature("\x1b]4;{color};rgb:{red:x}/{green:x}/{blue:x}\x1b\\", "\x1b]104\x1b\\")
 
@@ -408,9 +427,17 @@ MOVE_MOUSE = "\x1b[?1003;1006h"  # sends only mouse move events
 RESET_MOUSE = "\x1b[?1000;1002;1003;1006l"
 
 # Mouse keys
-KEY_MOUSE_PRESS = "\x1b[<{button};{row};{columns}m"
-KEY_MOUSE_RELEASE = "\x1b[<{button};{row};{columns}M"
+# the button is a bitmask of the button number, modifiers, movement and wheel (see MOUSE_*)
+KEY_MOUSE_PRESS = "\x1b[<{button};{column};{row}M"
+KEY_MOUSE_RELEASE = "\x1b[<{button};{column};{row}m"
 KEY_CURSOR = "\x1b[{row};{column}R"
+MOUSE_BUTTON = 0b00000011
+MOUSE_SHIFT = 0b00000100
+MOUSE_META = 0b00001000
+MOUSE_CTRL = 0b00010000
+MOUSE_MOVE = 0b00100000
+MOUSE_WHEEL = 0b01000000
+MOUSE_EXTRA = 0b10000000
 
 # Keys
 # xterm sends an escape sequence followed by a bitmask of modifiers pressed
@@ -529,8 +556,9 @@ KEYS = [
 ]
 
 DYNAMIC_KEYS = [
-  Key("mouse_press", "\x1b[<{button};{row};{columns}m"),
-  Key("mouse_release", "\x1b[<{button};{row};{columns}M"),
+  Key("mouse_press", "\x1b[<{button};{column};{row}M"),
+  Key("mouse_release", "\x1b[<{button};{column};{row}m"),
+  Key("mouse_move", "\x1b[<{button};{column};{row}M"),  # button has MOUSE_MOVE set
 
   Key("cursor", "\x1b[{row};{column}R"),
 ]
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Incremental decoding of terminal input into keys.
+The static key sequences are arranged into a prefix tree once, so input is decoded by walking it a
+character at a time, taking the longest sequence which matches. Sequences cut off at the end of the
+input are held until more input arrives.
+Control sequences which carry parameters, such as mouse and cursor reports, are decoded directly from
+their parameters.
+"""
+
+from typing import Dict, List
+
+from . import escape
+from .escape import CursorKey, Key, MouseKey
+
+__all__ = ["KeyDecoder"]
+
+ESCAPE = "\x1b"
+CSI = "\x1b["
+
+def build_tree(keys: List[Key]) -> Dict:
+  """
+  Arranges keys into a tree of nested dicts indexed by each character of their value. The key ending
+  at a node is stored under the empty string, which no character can be.
+  """
+  tree = {}
+  for key in keys:
+    node = tree
+    for char in key.value:
+      node = node.setdefault(char, {})
+    node.setdefault("", key)  # the first definition of a sequence wins
+  return tree
+
+TREE = build_tree(escape.KEYS)
+
+def parse_params(params: str) -> List[int]:
+  """Parses the ";" separated parameters of a control sequence, where any left empty are 0."""
+  try:
+    return [int(param) if param else 0 for param in params.split(";")]
+  except ValueError:
+    return []
+
+def decode_csi(value: str, params: str, final: str) -> Key:
+  """
+  Decodes the dynamic control sequences which report the mouse and cursor, given the parameters and
+  final character of the sequence.
+  """
+  if params.startswith("<") and (final == "M" or final == "m"):
+    numbers = parse_params(params[1:])
+    if len(numbers) == 3:
+      button, column, row = numbers
+      modifiers = 0
+      if button & escape.MOUSE_SHIFT:
+        modifiers |= Key.SHIFT
+      if button & escape.MOUSE_META:
+        modifiers |= Key.META
+      if button & escape.MOUSE_CTRL:
+        modifiers |= Key.CTRL
+
+      if final == "m":
+        name = "mouse_release"
+      elif button & escape.MOUSE_MOVE:
+        name = "mouse_move"
+      else:
+        name = "mouse_press"
+
+      # the wheel and extra buttons count on from the regular buttons, at 4 and 8 respectively
+      button = button & escape.MOUSE_BUTTON | (button & (escape.MOUSE_WHEEL | escape.MOUSE_EXTRA)) >> 4
+      return MouseKey(name, value, modifiers, button, row - 1, column - 1)
+
+  elif final == "R":
+    numbers = parse_params(params)
+    if len(numbers) == 2:
+      row, column = numbers
+      return CursorKey("cursor", value, 0, row - 1, column - 1)
+
+  return Key("unknown", value)
+
+class KeyDecoder:
+  """
+  Decodes input into keys, holding on to any incomplete sequence at the end of the input until it is
+  completed by the next feed, or until flush gives up waiting on it.
+  """
+  def __init__(self):
+    self.pending = ""
+
+  def feed(self, text: str) -> List[Key]:
+    """
+    Decodes the keys in the text, following on from any pending input.
+
+    >>> decoder = KeyDecoder()
+    >>> decoder.feed("\\x1b")
+    []
+    >>> decoder.feed("[A")
+    [Key(key='up', value='\\x1b[A', modifiers=0)]
+
+    An escape before a character is the meta modifier, and control sequences which aren't known are
+    kept whole
+    >>> decoder.feed("\\x1bx")
+    [Key(key='x', value='\\x1bx', modifiers=2)]
+    >>> decoder.feed("\\x1b[42q")
+    [Key(key='unknown', value='\\x1b[42q', modifiers=0)]
+
+    A sequence ends at the first character which can't be part of it, and an escape key may come right
+    before a sequence
+    >>> decoder.feed("\\x1b[1\\r")
+    [Key(key='unknown', value='\\x1b[1', modifiers=0), Key(key='return', value='\\r', modifiers=0)]
+    >>> decoder.feed("\\x1b\\x1b[A")
+    [Key(key='escape', value='\\x1b', modifiers=0), Key(key='up', value='\\x1b[A', modifiers=0)]
+    """
+    return self._decode(self.pending + text, final=False)
+
+  def flush(self) -> List[Key]:
+    """
+    Decodes any pending input as it is, such as a lone escape key.
+
+    >>> decoder = KeyDecoder()
+    >>> decoder.feed("\\x1b")
+    []
+    >>> decoder.flush()
+    [Key(key='escape', value='\\x1b', modifiers=0)]
+    """
+    return self._decode(self.pending, final=True)
+
+  def _decode(self, data: str, final: bool) -> List[Key]:
+    keys = []
+    index = 0
+    length = len(data)
+    while index < length:
+      # walk the tree for the longest matching sequence
+      node = TREE
+      match = None
+      end = index
+      position = index
+      while position < length:
+        node = node.get(data[position])
+        if node is None:
+          break
+        position += 1
+        if "" in node:
+          match = node[""]
+          end = position
+      else:
+        if not final and len(node) > ("" in node):
+          break  # the input stops part way into a sequence, so wait for the rest of it
+
+      if match is not None and match.value == ESCAPE * 2 and (end == length or data[end] in "[O"):
+        # a second escape may instead start a sequence, after an escape key of it's own
+        if end == length and not final:
+          break
+        elif end < length:
+          match = TREE[ESCAPE][""]
+          end = index + 1
+
+      if match is not None and match.value == ESCAPE and end < length:
+        key, end = self._decode_escape(data, end, final)
+        if key is None:
+          break
+        keys.append(key)
+      elif match is not None:
+        keys.append(match)
+      else:
+        keys.append(self._decode_char(data[index]))
+        end = index + 1
+      index = end
+
+    self.pending = data[index:]
+    return keys
+
+  def _decode_escape(self, data: str, start: int, final: bool):
+    """
+    Decodes an escape which isn't followed by a known sequence, returning the key and where it ends,
+    or None if the rest of the sequence is still to come.
+    """
+    char = data[start]
+    if char == "[":
+      # find the final character, after the parameters and intermediates of the control sequence
+      for position in range(start + 1, len(data)):
+        if "@" <= data[position] <= "~":
+          value = data[start - 1:position + 1]
+          return decode_csi(value, data[start + 1:position], data[position]), position + 1
+        elif not " " <= data[position] <= "?":
+          # anything else can't be part of the sequence, so it was cut short and the rest is input
+          if position == start + 1:
+            return Key("[", ESCAPE + "[", Key.META), position
+          return Key("unknown", data[start - 1:position]), position
+      if not final:
+        return None, start
+      return Key("unknown", data[start - 1:]), len(data)
+
+    if char.isprintable() and (char != "O" or start + 1 == len(data)):
+      # the meta modifier prefixes the character with an escape, "O" otherwise starts a sequence
+      return Key(char, ESCAPE + char, Key.META), start + 1
+    return TREE[ESCAPE][""], start
+
+  def _decode_char(self, char: str) -> Key:
+    if "\x01" <= char <= "\x1a":
+      # control characters without their own key are control held with a letter
+      return Key(chr(ord(char) + 0x60), char, Key.CTRL)
+    return Key(char, char)
+
+if __name__ == "__main__":
+  import doctest
+  doctest.testmod()
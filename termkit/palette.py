@@ -0,0 +1,102 @@
+"""
+Quantization of colors onto the palettes of terminals without truecolor support.
+The closest color of the 256 color palette is found directly from the channels. The 8 and 16 color
+palettes have to be searched, so they have a lookup table indexed by the top bits of each channel,
+which is filled in as colors are used, so that each color only has to be searched for once.
+"""
+
+import functools
+
+from array import array
+from typing import Tuple
+
+from . import escape
+from .style import Color, gamma_expansion
+
+__all__ = ["quantize"]
+
+# the channel levels of the 6x6x6 color cube (16-231) and the grayscale ramp (232-255)
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+GRAY_LEVELS = tuple(range(8, 239, 10))
+
+BITS = 5  # bits of each channel used to index the lookup tables
+SHIFT = 8 - BITS
+HALF = (1 << SHIFT) // 2
+
+def _linear(channel: int) -> int:
+  return gamma_expansion(channel)
+
+# since the difference between colors is summed per channel, the closest color in the cube is made
+# up of the closest level for each channel, so the levels are found up front
+CUBE_INDEX = bytes(
+  min(range(len(CUBE_LEVELS)), key=lambda i: abs(_linear(CUBE_LEVELS[i]) - _linear(channel)))
+  for channel in range(256)
+)
+
+_tables = {}
+
+def _distance(color: Color, other: Color) -> Tuple[float, float]:
+  # the darkest levels round to the same linear value, so ties go to the closer channels
+  return (color.difference(other), color.difference(other, gamma=1))
+
+# the exact search is cheap but not free, so the most recently used colors are kept
+@functools.lru_cache(maxsize=4096)
+def _closest_256(color: Color) -> int:
+  red, green, blue = color
+  cube = 16 + 36 * CUBE_INDEX[red] + 6 * CUBE_INDEX[green] + CUBE_INDEX[blue]
+  cube_color = Color(CUBE_LEVELS[CUBE_INDEX[red]], CUBE_LEVELS[CUBE_INDEX[green]], CUBE_LEVELS[CUBE_INDEX[blue]])
+
+  # the difference to a gray is least at the middle channel, so the closest gray is one of the two
+  # levels either side of it
+  below = min(max((sorted(color)[1] - GRAY_LEVELS[0]) // 10, 0), len(GRAY_LEVELS) - 1)
+  gray = min(
+    range(below, min(below + 2, len(GRAY_LEVELS))),
+    key=lambda i: _distance(color, Color(*(GRAY_LEVELS[i],) * 3)),
+  )
+  gray_color = Color(*(GRAY_LEVELS[gray],) * 3)
+
+  if _distance(color, gray_color) < _distance(color, cube_color):
+    return 232 + gray
+  return cube
+
+def _closest(color: Color, colors: int) -> int:
+  _, closest_id = color.closest_color([c[0] for c in escape.COLORS[:colors]])
+  return closest_id
+
+def quantize(color: Color, colors: int) -> int:
+  """
+  Finds the id of the closest color in a palette with the given amount of colors.
+
+  >>> quantize(Color(255, 0, 0), 256)
+  196
+  >>> quantize(Color(250, 10, 5), 16)
+  9
+  >>> quantize(Color(118, 118, 118), 256)
+  243
+  >>> quantize(Color(88, 88, 88), 256)
+  240
+  """
+  if colors >= 256:
+    return _closest_256(color)
+
+  colors = 16 if colors >= 16 else 8
+  table = _tables.get(colors)
+  if table is None:
+    table = _tables[colors] = array("h", [-1]) * (1 << (3 * BITS))
+
+  red, green, blue = color
+  index = (red >> SHIFT) << (2 * BITS) | (green >> SHIFT) << BITS | blue >> SHIFT
+  closest_id = table[index]
+  if closest_id < 0:
+    # search from the middle of the colors which share this entry
+    middle = Color(
+      (red >> SHIFT << SHIFT) + HALF,
+      (green >> SHIFT << SHIFT) + HALF,
+      (blue >> SHIFT << SHIFT) + HALF,
+    )
+    closest_id = table[index] = _closest(middle, colors)
+  return closest_id
+
+if __name__ == "__main__":
+  import doctest
+  doctest.testmod()
@@ -0,0 +1,137 @@
+"""
+Recording of terminal sessions in the asciicast v2 format, and replaying them.
+https://docs.asciinema.org/manual/asciicast/v2/
+"""
+
+import io
+import json
+import time
+
+from typing import Callable, Dict, IO, Iterator, Tuple, Union
+
+from .term import Terminal
+
+__all__ = ["Recorder", "read_cast", "replay"]
+
+# output written within this many seconds of the start of an event is recorded as part of it
+COALESCE = 0.01
+
+class Recorder(io.TextIOBase):
+  """
+  A stream which passes everything written on to another, while recording it with the time it was
+  written into an asciicast file. Set it as the stdout of a Terminal.
+  Writes close together are recorded as a single event, and events are only encoded when the stream is
+  flushed or the next event starts, so recording costs little more than a list append per write.
+
+  The recorder has no file descriptor of it's own, so a terminal sends each frame through write.
+  """
+  def __init__(
+    self,
+    stream: IO[str],
+    cast: Union[str, IO[str]],
+    width: int,
+    height: int,
+    *_,
+    title: Union[str, None] = None,
+    env: Union[Dict[str, str], None] = None,
+    clock: Callable[[], float] = time.monotonic,
+  ):
+    self.stream = stream
+    self._owned = isinstance(cast, str)
+    self.cast = open(cast, "w", encoding="utf-8") if self._owned else cast
+    self.clock = clock
+    self._start = clock()
+    self._chunks = []
+    self._chunk_time = None
+
+    header = {"version": 2, "width": width, "height": height, "timestamp": int(time.time())}
+    if title is not None:
+      header["title"] = title
+    if env is not None:
+      header["env"] = env
+    self.cast.write(json.dumps(header) + "\n")
+
+  @property
+  def encoding(self) -> str:
+    return getattr(self.stream, "encoding", None) or "utf-8"
+
+  def writable(self) -> bool:
+    return True
+
+  def write(self, text: str) -> int:
+    self.stream.write(text)
+    now = self.clock()
+    if self._chunks and now - self._chunk_time >= COALESCE:
+      self._record()
+    if not self._chunks:
+      self._chunk_time = now
+    self._chunks.append(text)
+    return len(text)
+
+  def _record(self):
+    if self._chunks:
+      event = [round(self._chunk_time - self._start, 6), "o", "".join(self._chunks)]
+      self.cast.write(json.dumps(event, ensure_ascii=False) + "\n")
+      self._chunks.clear()
+
+  def flush(self):
+    self._record()
+    self.stream.flush()
+
+  def close(self):
+    """Finishes the recording, closing the cast if it was opened by the recorder."""
+    if self.closed:
+      return
+    self._record()
+    if self._owned:
+      self.cast.close()
+    else:
+      self.cast.flush()
+    super().close()
+
+def read_cast(cast: Union[str, IO[str]]) -> Tuple[Dict, Iterator[Tuple[float, str]]]:
+  """Reads the header of an asciicast, and returns it along with the time and data of each output."""
+  file = open(cast, encoding="utf-8") if isinstance(cast, str) else cast
+  header = json.loads(file.readline())
+  if header.get("version") != 2:
+    raise ValueError("Only version 2 asciicasts are supported, not {}".format(header.get("version")))
+
+  def events():
+    try:
+      for line in file:
+        if line.strip():
+          elapsed, kind, data = json.loads(line)
+          if kind == "o":
+            yield (elapsed, data)
+    finally:
+      if file is not cast:
+        file.close()
+  return header, events()
+
+def replay(
+  cast: Union[str, IO[str]],
+  output: Union[Terminal, IO[str]],
+  speed: Union[float, None] = 1.0,
+  sleep: Callable[[float], None] = time.sleep,
+) -> Dict:
+  """
+  Writes the output of an asciicast to a terminal or a stream, such as an Emulator, at it's original
+  speed multiplied by speed, or as fast as possible when speed is None. Returns the header of the cast.
+  """
+  header, events = read_cast(cast)
+  start = time.monotonic()
+  for elapsed, data in events:
+    if speed:
+      delay = elapsed / speed - (time.monotonic() - start)
+      if delay > 0:
+        output.flush()
+        sleep(delay)
+    # a terminal is written to through it's own frames, writer or queue, keeping the output in order
+    output.write(data)
+  output.flush()
+
+  if isinstance(output, Terminal):
+    # the recording moved the cursor and changed the style without the terminal following along
+    output.invalidate_pos()
+    output.invalidate_style()
+  return header
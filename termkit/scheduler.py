@@ -0,0 +1,106 @@
+"""
+Scheduling of frames, so that the screen is only presented after it changed, and no more often than
+the frame rate allows.
+"""
+
+import contextlib
+import threading
+import time
+
+from typing import Callable, Union
+
+from .screen import Screen
+
+__all__ = ["Scheduler"]
+
+class Scheduler:
+  """
+  Presents a screen when it has been marked dirty, at most fps times a second.
+  Every update made between two frames is coalesced into the next one, and nothing is drawn while
+  the screen is idle. Updates made while a frame is waiting to be presented only mark it dirty again,
+  so intermediate frames are dropped instead of queued up.
+
+  The scheduler can be run in a thread of it's own with run, or driven from another loop by calling
+  tick whenever next_deadline has passed.
+  """
+  def __init__(self, screen: Screen, fps: float = 60, clock: Callable[[], float] = time.monotonic):
+    self.screen = screen
+    self.fps = fps
+    self.clock = clock
+    self.frames = 0  # the number of frames presented
+
+    self._dirty = False
+    self._last = None  # the time the last frame was presented
+    self._running = False
+    # guards the screen, so frames are never presented in the middle of an update
+    self._condition = threading.Condition(threading.RLock())
+
+  @property
+  def interval(self) -> float:
+    """The shortest time between two frames in seconds."""
+    return 1 / self.fps
+
+  @property
+  def dirty(self) -> bool:
+    return self._dirty
+
+  def mark_dirty(self):
+    """Schedules a frame for the changes made to the screen."""
+    with self._condition:
+      self._dirty = True
+      self._condition.notify()
+
+  @contextlib.contextmanager
+  def update(self):
+    """Holds off frames while the screen is changed within the context, then marks it dirty."""
+    with self._condition:
+      try:
+        yield self.screen
+      finally:
+        self.mark_dirty()
+
+  def next_deadline(self) -> Union[float, None]:
+    """The time by the clock the next frame is due, or None when the screen is idle."""
+    if not self._dirty:
+      return None
+    if self._last is None:
+      return self.clock()
+    return self._last + self.interval
+
+  def tick(self) -> bool:
+    """Presents the screen if a frame is due, returning whether it was."""
+    with self._condition:
+      deadline = self.next_deadline()
+      if deadline is None:
+        return False
+      now = self.clock()
+      if now < deadline:
+        return False
+
+      self._dirty = False
+      self._last = now
+      self.screen.present()
+      self.frames += 1
+      return True
+
+  def run(self):
+    """Presents frames as they are due until stopped, sleeping while the screen is idle."""
+    with self._condition:
+      self._running = True
+      while self._running:
+        deadline = self.next_deadline()
+        if deadline is None:
+          self._condition.wait()
+          continue
+
+        timeout = deadline - self.clock()
+        if timeout > 0:
+          self._condition.wait(timeout)
+          continue
+        self.tick()
+
+  def stop(self):
+    """Stops run, after the frame being presented if there is one."""
+    with self._condition:
+      self._running = False
+      self._condition.notify()
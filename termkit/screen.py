@@ -0,0 +1,122 @@
+from typing import Union
+
+from .canvas import Cell, FastCanvas, Scroll, SCROLL_MIN_ROWS
+from .term import Terminal
+from .tty import tty
+
+__all__ = ["Screen"]
+
+class Screen:
+  """
+  A double buffered canvas covering the whole terminal.
+  The application draws into the back buffer, and present sends only the cells which differ from the
+  front buffer, which holds what was last presented and so what is already on the terminal.
+
+  However the back buffer is edited, the terminal shows the same cells after every present
+  >>> import random
+  >>> from termkit.emulator import Emulator
+  >>> from termkit.style import Color
+  >>> emulator = Emulator(8, 16)
+  >>> screen = Screen(Terminal(None, emulator, colors=256, truecolor=True), 8, 16)
+  >>> screen.back.fill(Cell(" "))
+  >>> rand = random.Random(0)
+  >>> def edit(canvas):
+  ...   cell = Cell(rand.choice("ab c"), rand.choice((None, 1, 200)), rand.choice((None, 4, Color(0, 0, 90))))
+  ...   action = rand.randrange(3)
+  ...   if action == 0:
+  ...     canvas[rand.randrange(8), rand.randrange(16)] = cell
+  ...   elif action == 1:
+  ...     top, bottom = sorted(rand.sample(range(9), 2))
+  ...     canvas.scroll(top, bottom, rand.choice((-2, -1, 1, 2)), fill=cell)
+  ...   else:
+  ...     canvas.view(rand.randrange(8), rand.randrange(16), rand.randrange(1, 5), rand.randrange(1, 9)).fill(cell)
+  >>> for frame in range(200):
+  ...   for _ in range(rand.randrange(1, 4)):
+  ...     edit(screen.back)
+  ...   screen.present()
+  ...   assert emulator.to_canvas().canvas == screen.back.canvas, frame
+  """
+  def __init__(self, term: Terminal, rows: Union[int, None] = None, cols: Union[int, None] = None):
+    self.term = term
+    if rows is None or cols is None:
+      size = tty.get_term_size(fdout=term.stdout.fileno())
+      rows = size.lines if rows is None else rows
+      cols = size.columns if cols is None else cols
+
+    self.back = FastCanvas(rows, cols)
+    term.columns = cols
+    self.front = FastCanvas()  # nothing is known about the terminal, so the first frame draws everything
+    self.scrolling = True  # whether shifted content is scrolled into place instead of drawn again
+
+    # with a writer, the last frame and the front buffer it was drawn over, for when it is replaced
+    self._frame = None
+    self._base = None
+
+  @property
+  def rows(self) -> int:
+    return self.back.rows
+
+  @property
+  def cols(self) -> int:
+    return self.back.cols
+
+  def resize(self, rows: int, cols: int):
+    """Resizes the back buffer, the next frame is drawn in full."""
+    self.back.resize(rows=rows, cols=cols)
+    self.term.columns = cols
+    self.invalidate()
+
+  def invalidate(self):
+    """Forgets what is on the terminal, so the next frame is drawn in full."""
+    self.front = FastCanvas()
+
+  def present(self):
+    """
+    Draws the changes between the back and front buffers to the terminal in a single write, as a
+    synchronized update when the terminal has it enabled.
+    With a writer, a frame still waiting to be sent is discarded and this one drawn in it's place.
+    """
+    term = self.term
+    rebased = term.writer is not None and term.writer.discard(self._frame)
+    if rebased:
+      # the terminal is left as it was before the discarded frame, wherever it left the cursor
+      self.front = self._base
+      term.invalidate_style()
+      term.invalidate_pos()
+    base, last_frame = self.front, term.last_frame
+
+    with term.synchronize(flush=True):
+      with term.phase("diff"):
+        # when content shifted, like a log which gained a line, scrolling the terminal moves it in place
+        scroll = None
+        if self.scrolling and len(self.back.damaged()) >= SCROLL_MIN_ROWS:
+          scroll = self.back.find_scroll(self.front)
+        if scroll:
+          self._scroll(scroll)
+
+        # the back buffer's damage is cleared whenever it matches the front, so only damage needs comparing
+        spans = self.back.diff(self.front, damaged_only=scroll is None and not rebased)
+      with term.phase("encode"):
+        self.back.draw_spans(term, spans)
+    if term.last_frame != last_frame:
+      self._frame, self._base = term.last_frame, base
+
+    self.front = self.back.copy()
+    self.back.clear_damage()
+
+  def _scroll(self, scroll: Scroll):
+    """Scrolls the terminal and the front buffer along with it."""
+    term = self.term
+    term.set_style()  # lines are scrolled in with the current background
+    region = (scroll.top, scroll.bottom) != (0, self.rows)
+    if region:
+      term.scroll_region(scroll.top + 1, scroll.bottom)
+    term.scroll(scroll.amount)
+    if region:
+      term.scroll_region()
+    self.front = self.front.copy()  # the front may be kept as the base of the frame
+    self.front.scroll(*scroll, fill=Cell(" "))
+
+if __name__ == "__main__":
+  import doctest
+  doctest.testmod()
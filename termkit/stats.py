@@ -0,0 +1,111 @@
+"""
+Opt-in instrumentation of rendering, for telling whether a slow terminal application spends it's time
+rendering or is sending too much output.
+"""
+
+import contextlib
+import re
+import time
+
+from collections import Counter
+from typing import Callable, Dict, List
+
+__all__ = ["RenderStats"]
+
+# escape sequences and runs of text, to be counted by their kind
+TOKEN = re.compile(
+  r"\x1b\[[\x30-\x3f]*[\x20-\x2f]*(?P<csi>[\x40-\x7e])"
+  r"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)?(?P<osc>)"
+  r"|\x1b(?P<esc>[\x20-\x2f]*[\x30-\x7e]?)"
+  r"|(?P<control>[\x00-\x1a\x1c-\x1f\x7f])"
+  r"|(?P<text>[^\x00-\x1f\x7f]+)"
+)
+CURSOR_FINALS = "ABCDEFGHdf`"
+CURSOR_CONTROLS = "\r\n\b"
+
+def kind(match: "re.Match") -> str:
+  """Tells whether the token moves the cursor, sets the style, is text or is any other sequence."""
+  group = match.lastgroup
+  if group == "text":
+    return "text"
+  elif group == "csi":
+    final = match.group("csi")
+    if final == "m":
+      return "sgr"
+    return "cursor" if final in CURSOR_FINALS else "other"
+  elif group == "esc":
+    escape = match.group("esc")
+    if escape[:1] == "(":
+      return "sgr"  # the charset is part of the style
+    return "cursor" if escape in ("7", "8") else "other"
+  elif group == "control":
+    return "cursor" if match.group("control") in CURSOR_CONTROLS else "other"
+  return "other"
+
+class RenderStats:
+  """
+  Counters and timings of what a terminal renders, kept when it is set as the stats of the terminal.
+  Sequences are counted by kind, which is one of cursor, sgr, text or other, and phases are timed
+  in seconds, which are diff, encode, write and flush.
+
+  At the end of every frame, each of the hooks is called with the numbers of that frame alone, in the
+  same form as snapshot.
+  """
+  def __init__(self, hooks: List[Callable[[Dict], None]] = ()):
+    self.hooks = list(hooks)
+    self.reset()
+
+  def reset(self):
+    self.frames = 0
+    self.bytes = 0
+    self.sequences = Counter()
+    self.cells_drawn = 0
+    self.cells_skipped = 0
+    self.timings = Counter()
+    self._last = self.snapshot()
+
+  def count(self, text: str, encoding: str = "utf-8"):
+    """Counts the sequences and bytes of the output."""
+    self.bytes += len(text.encode(encoding))
+    for match in TOKEN.finditer(text):
+      self.sequences[kind(match)] += 1
+
+  def cells(self, drawn: int, skipped: int = 0):
+    self.cells_drawn += drawn
+    self.cells_skipped += skipped
+
+  @contextlib.contextmanager
+  def phase(self, name: str):
+    """Times everything within the context as part of the phase."""
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.timings[name] += time.perf_counter() - start
+
+  def snapshot(self) -> Dict:
+    """The totals of every frame so far."""
+    return {
+      "frames": self.frames,
+      "bytes": self.bytes,
+      "sequences": dict(self.sequences),
+      "cells_drawn": self.cells_drawn,
+      "cells_skipped": self.cells_skipped,
+      "timings": dict(self.timings),
+    }
+
+  def end_frame(self):
+    """Finishes counting the frame, calling the hooks with what it took."""
+    self.frames += 1
+    current = self.snapshot()
+    if self.hooks:
+      frame = {
+        key: (
+          {name: value - self._last[key].get(name, 0) for name, value in current[key].items()}
+          if isinstance(value, dict) else value - self._last[key]
+        )
+        for key, value in current.items()
+      }
+      for hook in self.hooks:
+        hook(frame)
+    self._last = current
@@ -1,4 +1,5 @@
 import colorsys
+import functools
 import typing
 
 from dataclasses import dataclass
@@ -7,7 +8,8 @@ from typing import Dict, Iterable, List, Tuple, Union
 # from termkit import escape
 
 __all__ = [
-  "ID_MAP", "NAME_MAP", "GAMMA", "gamma_expansion", "gamma_compression", "Color",
+  "ID_MAP", "NAME_MAP", "GAMMA", "gamma_table", "gamma_expansion", "gamma_compression", "Color",
+  "INTERN_SIZE", "intern_color",
   "BOLD", "DIM", "REVERSE", "UNDERLINE", "ITALIC", "CONCEAL", "BLINK", "STRIKE", "CHARSET",
   "HYPERLINK",
 ]
@@ -17,18 +19,31 @@ ID_MAP = []
 NAME_MAP = []
 GAMMA = 2.2
 
+@functools.lru_cache(maxsize=16)
+def gamma_table(gamma=GAMMA) -> Tuple[int, ...]:
+  """
+  Precomputes the gamma curve for every channel value, cached for the most recently used gammas.
+
+  >>> gamma_table()[128]
+  56
+  """
+  return tuple(round((channel / 255) ** gamma * 255) for channel in range(256))
+
 def gamma_expansion(channel: int, gamma=GAMMA) -> int:
   """Converts a non-linear color channel to a linear one"""
+  if type(channel) is int and 0 <= channel <= 255:
+    return gamma_table(gamma)[channel]
   return round((channel / 255) ** gamma * 255)
 
 def gamma_compression(channel: int, gamma=GAMMA) -> int:
   """Converts a linear color channel to a non-linear one"""
   return gamma_expansion(channel, 1 / gamma)
 
-@dataclass(init=True, eq=True, order=False, frozen=True)
+@dataclass(init=True, eq=True, order=False, frozen=True, slots=True)
 class Color():
   """
   Abstraction of a quadratic space RGB color.
+  Colors made often should come from intern_color, so that equal colors are the same object.
 
   >>> Color(red=255, green=0, blue=0)
   Color(red=255, green=0, blue=0)
@@ -41,6 +56,14 @@ class Color():
   green: int = 0
   blue: int = 0
 
+  def __eq__(self, other) -> bool:
+    # interned colors are compared by identity before their channels
+    if self is other:
+      return True
+    if other.__class__ is not self.__class__:
+      return NotImplemented
+    return self.red == other.red and self.green == other.green and self.blue == other.blue
+
   def __hex__(self) -> str:
     return f"0x{self.red:02x}{self.green:02x}{self.blue:02x}"
 
@@ -53,14 +76,12 @@ class Color():
 
   def difference(self, other: "Color", gamma=GAMMA) -> float:
     """Computes the euclidean difference between two colors"""
-    result = 0.0
-
-    # find the linear average between the colors
-    for self_channel, other_channel in zip(self, other):
-      difference = gamma_expansion(self_channel, gamma=gamma) - gamma_expansion(other_channel, gamma=gamma)
-      result += abs(difference)
-
-    return result
+    table = gamma_table(gamma)
+    return float(
+      abs(table[self.red] - table[other.red])
+      + abs(table[self.green] - table[other.green])
+      + abs(table[self.blue] - table[other.blue])
+    )
 
   def closest_color(self, colors: Iterable["Color"], gamma=GAMMA) -> Tuple["Color", float]:
     """
@@ -74,8 +95,9 @@ class Color():
     (Color(red=128, green=128, blue=128), 61.0)
     """
     # short circuit
+    colors = list(colors)
     if self in colors:
-      return (self, 0)
+      return (self, colors.index(self))
 
     # search in iterable
     sums = tuple((color, i) for i, color in enumerate(colors))
@@ -83,7 +105,7 @@ class Color():
 
   def mix(self, other: "Color", gamma=GAMMA) -> "Color":
     """
-    Mixes two colors, constructing a new color
+    Mixes two colors, giving the interned color of the mix
 
     >>> NAME_MAP["red"].mix(NAME_MAP["blue"])
     Color(red=186, green=0, blue=186)
@@ -91,18 +113,38 @@ class Color():
     >>> NAME_MAP["white"].mix(NAME_MAP["black"])
     Color(red=186, green=186, blue=186)
     """
-    channels = []
+    expansion = gamma_table(gamma)
+    compression = gamma_table(1 / gamma)
 
     # find the linear average between the colors
-    for self_channel, other_channel in zip(self, other):
-      average = gamma_expansion(self_channel, gamma=gamma) + gamma_expansion(other_channel, gamma=gamma)
-      average /= 2
-      channels.append(gamma_compression(round(average), gamma=gamma))
-
-    return self.__class__(*channels)
+    channels = (
+      compression[round((expansion[self_channel] + expansion[other_channel]) / 2)]
+      for self_channel, other_channel in zip(self, other)
+    )
+    if self.__class__ is not Color:
+      return self.__class__(*channels)
+    return intern_color(*channels)
 
   __add__ = mix
 
+# the most values kept by each interning pool, past which the least recently used are dropped,
+# enough for every cell of a large screen to be different
+INTERN_SIZE = 16384
+
+@functools.lru_cache(maxsize=INTERN_SIZE)
+def _intern_color(red: int, green: int, blue: int) -> Color:
+  return Color(red, green, blue)
+
+def intern_color(red: int = 0, green: int = 0, blue: int = 0) -> Color:
+  """
+  Gets the one shared color with the channels, creating it the first time.
+
+  >>> intern_color(255, 0, 0) is intern_color(red=255, blue=0)
+  True
+  """
+  # the cache is keyed by how it is called, so every channel is passed the same way
+  return _intern_color(red, green, blue)
+
 # ID_MAP += [Color(*color[0]) for color in escape.COLORS]
 
 # NAME_MAP += [color[1] for color in escape.COLORS]
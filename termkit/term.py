@@ -1,21 +1,47 @@
+import codecs
+import contextlib
 import functools
 import importlib
 import io
 import os
+import selectors
 import sys
+import unicodedata
 
 from collections import namedtuple
-from typing import Union, Iterable, List
-
-import parse
+from typing import TYPE_CHECKING, Union, Iterable, List
 
+from . import encode
 from . import escape
+from . import keys
+from . import palette
 from . import style
 
 from .escape import Key
+from .stats import RenderStats
 from .style import Color
-
-__all__ = ["Terminal"]
+from .tty import tty
+
+if TYPE_CHECKING:
+  from .writer import FrameWriter  # only used for annotations, the writer is passed in when wanted
+
+__all__ = ["Terminal", "is_narrow"]
+
+# select graphic rendition parameters for each attribute, bold and dim share the same reset
+INTENSITY = style.BOLD | style.DIM
+INTENSITY_RESET = "22"
+SGR_INTENSITY = (
+  (style.BOLD, "1"),
+  (style.DIM, "2"),
+)
+SGR_ATTRIBUTES = (
+  (style.REVERSE, "7", "27"),
+  (style.UNDERLINE, "4", "24"),
+  (style.ITALIC, "3", "23"),
+  (style.CONCEAL, "8", "28"),
+  (style.BLINK, "5", "25"),
+  (style.STRIKE, "9", "29"),
+)
 
 # TODO: write support detection for color, truecolor, and terminal size
 # NOTE: we can print the 256 color sequence, then the truecolor one, and terminals which only
@@ -23,6 +49,24 @@ __all__ = ["Terminal"]
 # https://stackoverflow.com/questions/40931467/how-can-i-manually-get-my-terminal-to-return-its-character-size?noredirect=1&lq=1
 # https://stackoverflow.com/questions/31619962/vt100-ansi-escape-sequences-getting-screen-size-conditional-ansi#31894026
 
+READ_SIZE = 65536  # the most input read at once, any more is left for the next read
+
+def is_narrow(text: str) -> bool:
+  """
+  Whether every character of the text takes up exactly one column. Wide characters take up two, and
+  combining marks and format characters take up none.
+
+  >>> is_narrow("abc"), is_narrow("漢"), is_narrow("e\u0301")
+  (True, False, False)
+  """
+  if text.isascii():
+    return True
+  return all(
+    unicodedata.east_asian_width(char) not in ("W", "F")
+    and unicodedata.category(char) not in ("Mn", "Me", "Cf")
+    for char in text
+  )
+
 class Terminal:
   """
   Control a teletype terminal connected via a stream with escape codes.
@@ -39,89 +83,357 @@ class Terminal:
     *_,
     colors: int = 8,
     truecolor: bool = False,
+    columns: Union[int, None] = None,
+    escape_timeout: float = 0.05,
+    synchronized: bool = False,
+    writer: Union["FrameWriter", None] = None,
+    stats: Union["RenderStats", None] = None,
   ):
     self.stdin = stdin
     self.stdout = stdout
     self.colors = colors
     self.truecolor = truecolor
-
-  def write(self, *args, **kwargs):
-    self.stdout.write(*args, **kwargs)
+    if columns is None:
+      try:
+        columns = tty.get_term_size(fdout=stdout.fileno()).columns
+      except (AttributeError, OSError, ValueError):
+        pass  # not a terminal, so the width stays unknown unless it is set
+    self.columns = columns  # the width of the terminal if known, for following the cursor
+
+    # the tracked (fg, bg, fx) of the terminal, or None when it isn't known
+    self._style = None
+
+    # the tracked position of the cursor, either of which is None when it isn't known
+    self._row = None
+    self._column = None
+    self._saved_pos = (None, None)
+
+    self.escape_timeout = escape_timeout  # seconds to wait for the rest of a sequence
+    self._keys = keys.KeyDecoder()
+    self._decoder = codecs.getincrementaldecoder(getattr(stdin, "encoding", None) or "utf-8")()
+    self._selector = None
+    self._peek = False  # whether input is read by peeking it's buffer, as it can't be waited on
+
+    # the output collected while batching, or None when writing directly to stdout
+    self._frame = None
+    self._frame_depth = 0
+    self.synchronized = synchronized  # whether frames are sent as synchronized updates
+    self._synchronizing = False
+    # the writer sending output from a thread of it's own, or None when writing directly to stdout
+    self.writer = writer
+    self.last_frame = None  # the id of the last frame submitted to the writer
+    self.stats = stats  # counts what is rendered when set
+
+  def write(self, text: str):
+    """Write text to the terminal, following the cursor as it moves."""
+    if not is_narrow(text):
+      # the width the terminal gives the text isn't certain, so where it leaves the cursor isn't either
+      self._row = self._column = None
+    elif text.isprintable():
+      self._advance(len(text))
+    else:
+      for char in text:
+        if char == "\r":
+          self._column = 0
+        elif char == "\b" and self._column:
+          self._column -= 1
+        elif char.isprintable():
+          self._advance(1)
+        else:
+          # newlines may or may not return the cursor, and other control characters are unknown
+          self._row = self._column = None
+          break
+    self._write(text)
+
+  def _advance(self, amount: int):
+    """Follows the cursor over the amount of printed characters."""
+    if self._column is None or self.columns is None:
+      # without the column and width, the text may have reached the edge and wrapped onto later rows
+      self._row = self._column = None
+      return
+    self._column += amount
+    if self._column >= self.columns:
+      # the cursor either stays on the last column or wraps, depending on the terminal
+      self._row = self._column = None
+
+  def _write(self, text: str):
+    if self._frame is not None:
+      self._frame.append(text)
+      return
+    self._count(text)
+    if self.writer is not None:
+      self.writer.write(text.encode(self.stdout.encoding or "utf-8"))
+    else:
+      self.stdout.write(text)
+
+  def _count(self, text: str):
+    """Counts the output as it is sent, when keeping stats."""
+    if self.stats is not None:
+      self.stats.count(text, self.stdout.encoding or "utf-8")
+
+  def writeb(self, data: bytes):
+    """Write bytes straight to the file descriptor of the output stream, bypassing it's buffer."""
+    fd = self.stdout.fileno()
+    view = memoryview(data)
+    while view:
+      view = view[os.write(fd, view):]  # os.write may only write part of it
+
+  # Frame buffering
+  # writing to the stream goes through it's encoder and buffer for every small string, so frames
+  # are collected in a list, then encoded and written all at once
+  @contextlib.contextmanager
+  def batch(self, flush: bool = False):
+    """
+    Collect everything written within the context and send it in a single write at the end, then
+    flush the output if flush is set.
+    """
+    self.begin_frame()
+    try:
+      yield self
+    finally:
+      self.end_frame(flush)
+
+  def begin_frame(self):
+    """Start collecting output into the frame buffer, frames may be nested."""
+    if self._frame is None:
+      self._frame = []
+    self._frame_depth += 1
+
+  def end_frame(self, flush: bool = False):
+    """
+    Finish the frame, sending the frame buffer once the outermost frame has finished, and flushing the
+    output after it if flush is set.
+    """
+    self._frame_depth -= 1
+    if self._frame_depth > 0:
+      return
+
+    frame = "".join(self._frame)
+    self._frame = None
+    try:
+      if frame:
+        self._send_frame(frame)
+      if flush:
+        self.flush()
+    finally:
+      # the stats of the frame cover everything up to the flush, even when nothing was sent
+      if self.stats is not None:
+        self.stats.end_frame()
+
+  def _send_frame(self, frame: str):
+    self._count(frame)
+    if self.writer is not None:
+      with self.phase("encode"):
+        data = frame.encode(self.stdout.encoding or "utf-8")
+      with self.phase("write"):
+        self.last_frame = self.writer.submit(data)
+      return
+
+    try:
+      self.stdout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+      # there is no file descriptor (like with StringIO), so write it as a single string instead
+      with self.phase("write"):
+        self.stdout.write(frame)
+      return
+
+    with self.phase("flush"):
+      self.stdout.flush()  # anything written before the frame goes first
+    with self.phase("encode"):
+      data = frame.encode(self.stdout.encoding or "utf-8")
+    with self.phase("write"):
+      self.writeb(data)
+
+  def phase(self, name: str):
+    """Times everything within the context as the phase of rendering, when keeping stats."""
+    if self.stats is None:
+      return contextlib.nullcontext()
+    return self.stats.phase(name)
+
+  @contextlib.contextmanager
+  def synchronize(self, flush: bool = False):
+    """
+    Batch everything written within the context, and have the terminal show it all at once when
+    synchronized output is enabled. Terminals without support ignore it.
+    """
+    if not self.synchronized or self._synchronizing:
+      with self.batch(flush):
+        yield self
+      return
+
+    self._synchronizing = True
+    self.begin_frame()
+    self._write(escape.SYNC[0])
+    start = len(self._frame)
+    try:
+      yield self
+    finally:
+      self._synchronizing = False
+      if len(self._frame) == start:
+        self._frame.pop()  # nothing was written, so there is nothing to show
+      else:
+        self._write(escape.SYNC[1])
+      self.end_frame(flush)
 
   # Terminal function
   def bell(self):
-    self.stdout.write(escape.BELL)
+    self._write(escape.BELL)
 
   def clear(self):
-    self.stdout.write(escape.CLEAR)
+    self._write(escape.CLEAR)
+    self._row = self._column = 0
 
   def reset(self):
-    self.stdout.write(escape.RESET)
+    self._write(escape.RESET)
+    self._style = (None, None, 0)
+    self._row = self._column = None
 
   def soft_reset(self):
-    self.stdout.write(escape.SOFT_RESET)
+    self._write(escape.SOFT_RESET)
+    self._style = (None, None, 0)
 
   # Terminal attributes
   # TODO: Implement some context managers for some of these, perhaps either as a separate method or
   # as a return if no state is provided or perhaps use/make a decorator
   # TODO: maybe shorten some of these method names
   def buffer(self, state: bool):
-    self.stdout.write(escape.BUFFER[0 if state else 1])
+    self._write(escape.BUFFER[0 if state else 1])
 
   def keypad(self, state: bool):
-    self.stdout.write(escape.KEYPAD[0 if state else 1])
+    self._write(escape.KEYPAD[0 if state else 1])
 
   def status(self, status: str):
-    self.stdout.write(escape.STATUS[0].format(status))
+    self._write(escape.STATUS[0].format(status))
 
   def paste(self, state: bool):
-    self.stdout.write(escape.PASTE[0 if state else 1])
+    self._write(escape.PASTE[0 if state else 1])
+
+  def sync(self, state: bool):
+    """Begin or end a synchronized update by hand, see synchronize."""
+    self._write(escape.SYNC[0 if state else 1])
 
   # Cursor manipulation
-  def move_to(self, row: Union[int, None] = None, column: Union[int, None] = None):
+  # while the cursor position is known, movements are planned to take the least amount of bytes
+  def move_to(
+    self,
+    row: Union[int, None] = None,
+    column: Union[int, None] = None,
+    text: Union[str, None] = None,
+  ):
     """
     Move the cursor absolutely with respect to the terminal grid.
     A value of None indicates no movement in that direction.
+    The text already on the terminal from the cursor onwards may be given, which will be printed over
+    itself when that is the shortest way to move right. It must be in the current style.
     """
-    # TODO: implement horizontal & vertical absolute position codes in
     if column is not None and column < 0:
       raise ValueError("Column cannot be negative (expected >=0, got {})".format(column))
     elif row is not None and row < 0:
       raise ValueError("Row cannot be negative (expected >=0, got {})".format(row))
 
-    if all((column, row)):
-      self.stdout.write(escape.MOVE_CURSOR.format(row=row, column=column))
-    elif column is not None:
-      self.stdout.write(escape.MOVE_COLUMN.format(column=column))
-    elif row is not None:
-      self.stdout.write(escape.MOVE_ROW.format(row=row))
-    # else row is None and column is None:
-      # pass
+    if row is None:
+      row = self._row
+    if column is None:
+      column = self._column
+    if row == self._row and column == self._column:
+      return
+
+    self._write(self._plan_move(row, column, text))
+    self._row = row
+    self._column = column
+
+  def _plan_move(self, row: Union[int, None], column: Union[int, None], text: Union[str, None]) -> str:
+    """Finds the shortest sequence moving the cursor to the position, None being unmoved."""
+    # positions are zero based, while the terminal counts from one
+    if row is not None and column is not None:
+      if row == 0 and column == 0:
+        shortest = escape.HOME_CURSOR
+      else:
+        shortest = encode.move_cursor(row + 1, column + 1)
+    else:
+      shortest = None
+
+    # cursor movements along each axis are independent, so take the shortest of each
+    vertical = ""
+    if row is not None and row != self._row:
+      vertical = encode.move_row(row + 1)
+      if self._row is not None:
+        amount = row - self._row
+        if amount > 0:
+          relative = encode.cursor_down(amount)
+        else:
+          relative = encode.cursor_up(-amount)
+        vertical = min(vertical, relative, key=len)
+
+    horizontal = ""
+    if column is not None and column != self._column:
+      options = [
+        encode.move_column(column + 1),
+        "\r" + encode.cursor_right(column) if column else "\r",
+      ]
+      if self._column is not None:
+        amount = column - self._column
+        if amount > 0:
+          options.append(encode.cursor_right(amount))
+          if not vertical and text is not None and len(text) >= amount:
+            options.append(text[:amount])
+        else:
+          options.append(encode.cursor_left(-amount))
+          options.append("\b" * -amount)
+      horizontal = min(options, key=len)
+
+    if shortest is None or len(vertical) + len(horizontal) < len(shortest):
+      shortest = vertical + horizontal
+    return shortest
 
   def move_by(self, x: int = 0, y: int = 0):
     """Move the cursor relatively with respect to it's current position."""
-    output = ""
+    if self._row is not None and self._column is not None:
+      if self._row + y >= 0 and self._column + x >= 0:
+        column = self._column + x
+        if self.columns is not None:
+          column = min(column, self.columns - 1)  # moving right stops at the last column
+        self.move_to(self._row + y, column)
+        return
+
+    vertical = horizontal = ""
     if y > 0:
-      output += escape.CURSOR_DOWN.format(amount=y)
+      vertical = encode.cursor_down(y)
     elif y < 0:
-      output += escape.CURSOR_UP.format(amount=-y)
+      vertical = encode.cursor_up(-y)
 
     if x > 0:
-      output += escape.CURSOR_RIGHT.format(amount=x)
+      horizontal = encode.cursor_right(x)
     elif x < 0:
-      output += escape.CURSOR_LEFT.format(amount=-x)
-    self.stdout.write(output)
+      horizontal = encode.cursor_left(-x)
+    self._write(vertical + horizontal)
+
+    # the terminal stops the cursor at it's edges, so only the unknown position is still unknown
+    if self._row is not None:
+      self._row = max(self._row + y, 0)
+    if self._column is not None:
+      self._column = max(self._column + x, 0)
+      if self.columns is not None:
+        self._column = min(self._column, self.columns - 1)
 
   def save_pos(self):
     """Saves the cursor position into a internal buffer."""
-    self.stdout.write(escape.SAVE_CURSOR)
+    self._write(escape.SAVE_CURSOR)
+    self._saved_pos = (self._row, self._column)
 
   def restore_pos(self):
     """Restores the cursor position from a internal buffer."""
-    self.stdout.write(escape.RESTORE_CURSOR)
+    self._write(escape.RESTORE_CURSOR)
+    self._row, self._column = self._saved_pos
+
+  def invalidate_pos(self):
+    """
+    Forget the tracked cursor position, for when it was moved without going through the terminal.
+    """
+    self._row = self._column = None
 
   def request_pos(self):
-    self.stdout.write(escape.REQUEST_CURSOR)
+    self._write(escape.REQUEST_CURSOR)
 
   def get_pos(self):
     raise NotImplementedError
@@ -133,7 +445,7 @@ class Terminal:
 
   # Cursor attributes
   def cursor_visibility(self, state: bool):
-    self.stdout.write(escape.CURSOR_VISIBILITY[0 if state else 1])
+    self._write(escape.CURSOR_VISIBILITY[0 if state else 1])
 
   def cursor_style(self, style: Union[str, None] = None, blink: bool = False):
     """
@@ -147,15 +459,15 @@ class Terminal:
     }
 
     if style is None:
-      self.stdout.write(escape.CURSOR_STYLE[1])
+      self._write(escape.CURSOR_STYLE[1])
     else:
-      self.stdout.write(escape.CURSOR_STYLE[0].format(style=styles[style] - int(blink)))
+      self._write(escape.CURSOR_STYLE[0].format(style=styles[style] - int(blink)))
 
   def cursor_color(self, color: Union[Color, None] = None):
     if color is None:
-      self.stdout.write(escape.CURSOR_COLOR[1])
+      self._write(escape.CURSOR_COLOR[1])
     else:
-      self.stdout.write(escape.CURSOR_COLOR[0].format(
+      self._write(escape.CURSOR_COLOR[0].format(
         red=color.red,
         green=color.green,
         blue=color.blue
@@ -163,13 +475,16 @@ class Terminal:
 
   # Line manipulation
   def clear_line(self):
-    self.stdout.write(escape.CLEAR_LINE)
+    self._write(escape.CLEAR_LINE)
+    self._column = 0
 
   def insert_line(self, row: int):
-    self.stdout.write(escape.INSERT_LINE.format(row=row))
+    self._write(escape.INSERT_LINE.format(row=row))
+    self._column = None  # some terminals return the cursor to the start of the line
 
   def delete_line(self, row: int):
-    self.stdout.write(escape.DELETE_LINE.format(row=row))
+    self._write(escape.DELETE_LINE.format(row=row))
+    self._column = None
 
   # Scrollfeed manipulation
   def scroll(self, row_delta: int):
@@ -178,161 +493,229 @@ class Terminal:
     necessary.
     """
     if row_delta > 0:
-      self.stdout.write(escape.SCROLL_UP.format(amount=row_delta))
+      self._write(escape.SCROLL_UP.format(amount=row_delta))
     elif row_delta < 0:
-      self.stdout.write(escape.SCROLL_DOWN.format(amount=-row_delta))
+      self._write(escape.SCROLL_DOWN.format(amount=-row_delta))
 
   def scroll_region(self, first: Union[None, int] = None, second: Union[None, int] = None):
     """Restrict the vertical region that scroll, insert_line and delete_line operate on."""
     if not all((first, second)):
       # Reset the scroll region first, especially if we are going to only reset one of the bounds
       # to it's natural position
-      self.stdout.write(escape.SCROLL_REGION[1])
+      self._write(escape.SCROLL_REGION[1])
 
     if any((first, second)):
-      self.stdout.write(escape.SCROLL_REGION[0].format(first=first or "", second=second or ""))
+      self._write(escape.SCROLL_REGION[0].format(first=first or "", second=second or ""))
+
+    # setting the scroll region moves the cursor home
+    self._row = self._column = 0
 
   # Text Attributes
-  # TODO: maybe turn these into properties with getters & setters
-  # TODO: store local state
+  # the current colors and attributes are tracked, so that only changes are sent to the terminal
+  def set_style(
+    self,
+    fg: Union[Color, int, None] = None,
+    bg: Union[Color, int, None] = None,
+    fx: int = 0,
+  ):
+    """
+    Set the colors and attributes all at once. Only what differs from the current state is sent,
+    combined into a single sequence.
+    A color of None resets it to the default color.
+    """
+    if self._style is None:
+      # the state of the terminal isn't known, so start from a clean slate
+      self.reset_style()
+    old_fg, old_bg, old_fx = self._style
+
+    # a hyperlink needs a target which a mask can't provide, so it is only set by hyperlink
+    fx = (fx & ~style.HYPERLINK) | (old_fx & style.HYPERLINK)
+    if fg == old_fg and bg == old_bg and fx == old_fx:
+      return
+
+    params = []
+    if fg != old_fg:
+      params.append(self._color_params(fg, 3))
+    if bg != old_bg:
+      params.append(self._color_params(bg, 4))
+
+    changed = fx ^ old_fx
+    if changed & INTENSITY:
+      if old_fx & INTENSITY & ~fx:
+        # bold and dim are reset together, so set whichever one should remain
+        params.append(INTENSITY_RESET)
+        changed |= fx & INTENSITY
+      for attribute, param in SGR_INTENSITY:
+        if changed & fx & attribute:
+          params.append(param)
+    for attribute, set_param, reset_param in SGR_ATTRIBUTES:
+      if changed & attribute:
+        params.append(set_param if fx & attribute else reset_param)
+
+    if params:
+      self._write(encode.sgr(params))
+    if changed & style.CHARSET:
+      self._write(escape.CHARSET[0 if fx & style.CHARSET else 1])
+
+    self._style = (fg, bg, fx)
+
+  def _set_attribute(self, attribute: int, state: bool):
+    fg, bg, fx = self._style or (None, None, 0)
+    self.set_style(fg, bg, fx | attribute if state else fx & ~attribute)
+
   def bold(self, state: bool):
-    self.stdout.write(escape.BOLD[0 if state else 1])
+    self._set_attribute(style.BOLD, state)
 
   def dim(self, state: bool):
-    self.stdout.write(escape.DIM[0 if state else 1])
+    self._set_attribute(style.DIM, state)
 
   def reverse(self, state: bool):
-    self.stdout.write(escape.REVERSE[0 if state else 1])
+    self._set_attribute(style.REVERSE, state)
 
   def underline(self, state: bool):
-    self.stdout.write(escape.UNDERLINE[0 if state else 1])
+    self._set_attribute(style.UNDERLINE, state)
 
   def italic(self, state: bool):
-    self.stdout.write(escape.ITALIC[0 if state else 1])
+    self._set_attribute(style.ITALIC, state)
 
   def conceal(self, state: bool):
-    self.stdout.write(escape.CONCEAL[0 if state else 1])
+    self._set_attribute(style.CONCEAL, state)
 
   def blink(self, state: bool):
-    self.stdout.write(escape.BLINK[0 if state else 1])
+    self._set_attribute(style.BLINK, state)
 
   def strike(self, state: bool):
-    self.stdout.write(escape.STRIKE[0 if state else 1])
+    self._set_attribute(style.STRIKE, state)
 
   def charset(self, state: bool):
-    self.stdout.write(escape.CHARSET[0 if state else 1])
+    self._set_attribute(style.CHARSET, state)
+
+  def hyperlink(self, state: bool, link: str = ""):
+    if self._style is None:
+      self.reset_style()
+    fg, bg, fx = self._style
 
-  def hyperlink(self, state: bool):
-    self.stdout.write(escape.HYPERLINK[0 if state else 1])
+    self._write(escape.HYPERLINK[0].format(link=link) if state else escape.HYPERLINK[1])
+    self._style = (fg, bg, fx | style.HYPERLINK if state else fx & ~style.HYPERLINK)
 
   def reset_style(self):
-    self.stdout.write(escape.RESET_STYLE)
+    self._write(escape.RESET_STYLE)
+    self._style = (None, None, 0)
+
+  def invalidate_style(self):
+    """
+    Forget the tracked colors and attributes, for when they were changed without going through the
+    terminal. The next change will reset the style before setting it.
+    """
+    self._style = None
 
   # Color
-  # NOTE: we can print the 256 color sequence, then the truecolor one, and terminals which only
-  #       recognise the 256 one will ignore the truecolor one
   def fg(self, color: Union[Color, int, None] = None):
-    if color is None:
-      self.stdout.write(escape.RESET_FGCOLOR)
-
-    elif type(color) is int:
-      if self.colors >= 256:
-        self.stdout.write(escape.FGCOLOR_256.format(color=color))
-      elif self.colors >= 16:
-        if color >= 8:
-          # 16 color code only takes in digits from 0-7
-          self.stdout.write(escape.FGCOLOR_16.format(color=color - 8))
-        else:
-          self.stdout.write(escape.FGCOLOR_8.format(color=color))
-      elif self.colors >= 8:
-        self.stdout.write(escape.FGCOLOR_8.format(color=color))
+    _, bg, fx = self._style or (None, None, 0)
+    self.set_style(color, bg, fx)
 
-    # truecolor
-    else:
-      # NOTE: this list operation may be expensive, constant such that self.colors doesn't change,
-      #       shared between the self.bg call. consider caching the result of this on the instance
-      #       level or any time self.colors is changed. also consider implementing this along side
-      #       with the local map for COLOR_PAIR described below
-      # NOTE: if we print the standard sequence, then the truecolor one, we retain backwards
-      #       compatibility
-      _, closest_id = color.closest_color(
-        [c[0] for c in escape.COLORS]
-      )
-      self.fg(closest_id)
-      self.stdout.write(escape.FGCOLOR_TRUE.format(
-        red=color.red,
-        green=color.green,
-        blue=color.blue
-      ))
+  def bg(self, color: Union[Color, int, None] = None):
+    fg, _, fx = self._style or (None, None, 0)
+    self.set_style(fg, color, fx)
 
-  def bg(self, color: Union[Color, int, None]):
+  def _color_params(self, color: Union[Color, int, None], layer: int) -> str:
+    """Select graphic rendition parameters for a color, where layer is 3 for fg and 4 for bg."""
     if color is None:
-      self.stdout.write(escape.RESET_BGCOLOR)
+      return encode.DEFAULT_COLORS[layer]
 
     elif type(color) is int:
-      if self.colors >= 256:
-        self.stdout.write(escape.BGCOLOR_256.format(color=color))
-      elif self.colors >= 16:
-        if color >= 8:
-          # 16 color code only takes in digits from 0-7
-          self.stdout.write(escape.BGCOLOR_16.format(color=color - 8))
-        else:
-          self.stdout.write(escape.BGCOLOR_8.format(color=color))
-      elif self.colors >= 8:
-        self.stdout.write(escape.BGCOLOR_8.format(color=color))
+      if not 0 <= color < len(escape.COLORS):
+        raise ValueError("Color id must be within the palette (expected 0-255, got {})".format(color))
+      elif self.colors >= 256:
+        return encode.indexed_color(color, layer)
+      elif color < (16 if self.colors >= 16 else 8):
+        return encode.basic_color(color, layer)
+      # the id is past the end of the terminal's palette, so it takes the closest color which isn't
+      return self._color_params(palette.quantize(escape.COLORS[color][0], self.colors), layer)
 
     # truecolor
-    else:
-      _, closest_id = color.closest_color(
-        [c[0] for c in escape.COLORS]
-      )
-      self.bg(closest_id)
-      self.stdout.write(escape.BGCOLOR_TRUE.format(
-        red=color.red,
-        green=color.green,
-        blue=color.blue
-      ))
+    elif self.truecolor:
+      return encode.true_color(color, layer)
+
+    return self._color_params(palette.quantize(color, self.colors), layer)
 
   # TODO: consider implementing COLOR_PAIR and a local per-instance mutable ID_MAP
 
   # Mouse modes
   def mouse(self, click: bool = False, drag: bool = False, move: bool = False):
-    self.stdout.write(escape.RESET_MOUSE)
+    self._write(escape.RESET_MOUSE)
     if click:
-      self.stdout.write(escape.CLICK_MOUSE)
+      self._write(escape.CLICK_MOUSE)
     if drag:
-      self.stdout.write(escape.DRAG_MOUSE)
+      self._write(escape.DRAG_MOUSE)
     if move:
-      self.stdout.write(escape.MOVE_MOUSE)
+      self._write(escape.MOVE_MOUSE)
 
   # Input handling
-  # for stdin attached to a tty, we can poll characters faster than we can process it, so we may
-  # be able to peek the buffer and sleep for an amount of time to see if anything has updated.
   # the tty is almost guaranteed to send multi character sequences complete in a single flush,
   # which means that we won't have to process it character by character, and we can immediately
-  # parse it into tokens.
-  # the simplest way to do this is to peek the internal buffer for content, which will block the
-  # thread if there is no data, or will dump the all of the buffer contents. because of the above,
-  # we can use this as a source of getting those "packets" of characters
-  def readb(self, size: int = -1) -> bytes:
-    contents = self.stdin.buffer.peek()  # block the thread until there is at least 1 character
-    if size > len(contents) or size <= 0:
-      return self.stdin.buffer.read(len(contents))
-    return self.stdin.buffer.read(size)
-
-  def read(self, size: int = -1) -> str:
-    return self.readb(size).decode(self.stdin.encoding)
+  # parse it into tokens. so we wait on the file descriptor until there is input, then read all of
+  # it at once, which also lets the wait time out, such as for telling a lone escape key apart.
+  # the windows console can't be waited on, so there reads peek the buffer, blocking until there is
+  # input, and never time out
+  def wait(self, timeout: Union[float, None] = None) -> bool:
+    """
+    Waits until there is input to read, returning False if it timed out first. Input which can't be
+    waited on is always ready, and reading it blocks instead.
+    """
+    if self._peek:
+      return True
+    elif self._selector is None:
+      selector = selectors.DefaultSelector()
+      try:
+        selector.register(self.stdin.fileno(), selectors.EVENT_READ)
+        ready = selector.select(timeout)
+      except (AttributeError, OSError, ValueError):
+        selector.close()
+        self._peek = True
+        return True
+      self._selector = selector
+      return bool(ready)
+    return bool(self._selector.select(timeout))
+
+  def readb(self, size: int = -1, timeout: Union[float, None] = None) -> bytes:
+    """
+    Reads the input which is available, waiting for up to timeout seconds for some to arrive. No
+    timeout waits until there is input and a timeout of 0 doesn't wait at all.
+    """
+    if not self.wait(timeout):
+      return b""
+    elif self._peek:
+      contents = self.stdin.buffer.peek()  # block the thread until there is at least 1 character
+      return self.stdin.buffer.read(size if size > 0 else len(contents))
+    return os.read(self.stdin.fileno(), size if size > 0 else READ_SIZE)
+
+  def read(self, size: int = -1, timeout: Union[float, None] = None) -> str:
+    # characters may be split between reads, so the decoder holds on to any partial character
+    return self._decoder.decode(self.readb(size, timeout))
 
   def flush(self, *args, **kwargs):
-    self.stdout.flush(*args, **kwargs)
+    with self.phase("flush"):
+      self.stdout.flush(*args, **kwargs)
 
   def parse_keys(self, raw: str) -> List[Key]:
-    out = []
-    keys = sorted(escape.KEYS, key=len)
-    while len(raw) > 0:
-      for key in keys:
-        if raw.startswith(key):
-          out += key
+    """
+    Decodes raw input into keys. Sequences cut off at the end of the input are completed by the next
+    call, and input is never decoded twice.
+    """
+    return self._keys.feed(raw)
+
+  def read_keys(self, timeout: Union[float, None] = None) -> List[Key]:
+    """
+    Reads and decodes the keys which are available, waiting for up to timeout seconds for them.
+    When the input stops part way into a sequence, the rest of it has escape_timeout seconds to
+    arrive before what there is is decoded as it is, which tells a lone escape key apart.
+    """
+    keys = self.parse_keys(self.read(timeout=timeout))
+    while self._keys.pending:
+      text = self.read(timeout=self.escape_timeout)
+      keys += self.parse_keys(text) if text else self._keys.flush()
+    return keys
 
   def collect_events(self):
     raise NotImplementedError
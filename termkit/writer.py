@@ -0,0 +1,144 @@
+"""
+Output written from a thread of it's own, so a slow terminal never blocks the application.
+"""
+
+import os
+import select
+import threading
+
+from typing import Union
+
+__all__ = ["FrameWriter"]
+
+# writing more than this to a blocking file descriptor which is ready may still block, and the tty
+# shares it's file description with stdin so it can't be made non-blocking without affecting it.
+# PIPE_BUF is only defined on unix, elsewhere the smallest size posix allows is used
+WRITE_SIZE = getattr(select, "PIPE_BUF", 512)
+
+class FrameWriter:
+  """
+  Writes to a file descriptor from a background thread.
+  Output is either committed, which is always sent in order, or a frame. Only the newest frame is
+  kept waiting to be sent, so that while the terminal is slow a frame can be discarded and replaced
+  by a newer one drawing the same changes, instead of every frame being queued up. A frame is
+  committed once the thread starts sending it, or when anything is submitted after it.
+
+  Once the writer is closed, or writing failed and stopped the thread, anything more written raises,
+  the same as writing to a closed or broken file.
+  """
+  def __init__(self, fd: int):
+    self.fd = fd
+    self.frames = 0  # the number of frames submitted
+    self.discarded = 0  # the number of frames discarded before being sent
+
+    self._outgoing = bytearray()  # committed output
+    self._pending = None  # the frame waiting to be sent
+    self._pending_id = None
+    self._closed = False
+    self._stopped = False  # whether the thread has finished
+    self.error = None  # the error which stopped the thread, if writing failed
+    self._condition = threading.Condition()
+    self._thread = threading.Thread(target=self._run, name="termkit-writer", daemon=True)
+    self._thread.start()
+
+  def write(self, data: bytes):
+    """Commits the data to be sent after everything submitted before it."""
+    with self._condition:
+      self._check()
+      self._commit()
+      self._outgoing += data
+      self._condition.notify_all()
+
+  def submit(self, frame: bytes) -> int:
+    """Submits a frame to be sent after everything submitted before it, returning it's id."""
+    with self._condition:
+      self._check()
+      self._commit()
+      self.frames += 1
+      self._pending = frame
+      self._pending_id = self.frames
+      self._condition.notify_all()
+      return self.frames
+
+  def discard(self, frame_id: Union[int, None]) -> bool:
+    """Discards the frame if it is still waiting to be sent, returning whether it was."""
+    with self._condition:
+      if frame_id is None or frame_id != self._pending_id:
+        return False
+      self._pending = self._pending_id = None
+      self.discarded += 1
+      return True
+
+  def _check(self):
+    if self.error is not None:
+      raise self.error
+    elif self._closed:
+      raise ValueError("Cannot write to a closed FrameWriter")
+
+  def _commit(self):
+    if self._pending is not None:
+      self._outgoing += self._pending
+      self._pending = self._pending_id = None
+
+  @property
+  def idle(self) -> bool:
+    """Whether everything submitted has been sent."""
+    with self._condition:
+      return not self._outgoing and self._pending is None
+
+  def flush(self, timeout: Union[float, None] = None) -> bool:
+    """
+    Waits until everything submitted has been sent, returning whether it was before the timeout.
+    Raises the error which stopped the thread if writing failed.
+    """
+    with self._condition:
+      sent = self._condition.wait_for(
+        lambda: (not self._outgoing and self._pending is None) or self._stopped, timeout
+      )
+      if self.error is not None:
+        raise self.error
+      return sent
+
+  def close(self, timeout: Union[float, None] = None):
+    """Stops the thread once everything submitted has been sent."""
+    with self._condition:
+      self._closed = True
+      self._condition.notify_all()
+    self._thread.join(timeout)
+
+  def _run(self):
+    try:
+      self._send()
+    finally:
+      with self._condition:
+        self._stopped = True
+        self._condition.notify_all()
+
+  def _send(self):
+    while True:
+      with self._condition:
+        self._condition.wait_for(lambda: self._outgoing or self._pending is not None or self._closed)
+        if not self._outgoing and self._pending is None:
+          return  # closed
+        if not self._outgoing:
+          self._commit()  # the frame starts being sent, so it can no longer be discarded
+        chunk = bytes(self._outgoing[:WRITE_SIZE])
+
+      # the descriptor is shared with the input of the tty, so it can't be made non-blocking without
+      # affecting it, instead writes wait until it is ready and are kept small enough not to block
+      select.select([], [self.fd], [])
+      try:
+        written = os.write(self.fd, chunk)
+      except (BlockingIOError, InterruptedError):
+        written = 0
+      except OSError as error:
+        # the terminal has gone away, so there is nowhere left to send anything
+        with self._condition:
+          self.error = error
+          self._outgoing.clear()
+          self._pending = self._pending_id = None
+        return
+
+      with self._condition:
+        del self._outgoing[:written]
+        self._condition.notify_all()